@@ -1,74 +1,290 @@
 """Audio alignment functionality for Keo Shortform Factory."""
 
+import os
+import hashlib
+from collections import OrderedDict
 import numpy as np
 import librosa
+import soundfile as sf
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
 import subprocess
 
-from .utils import run_ffmpeg_command, ensure_dir
+from numba import njit
+from scipy import fft as sp_fft
+from scipy.signal import choose_conv_method, correlate, decimate
 
+from .utils import run_ffmpeg_command, run_cached_ffprobe_command, ensure_dir, decode_audio_samples
 
-def compute_onset_envelope(audio_path: str, sr: int = 48000) -> np.ndarray:
-    """Compute onset envelope from audio file."""
-    try:
-        # Load audio with librosa
-        y, _ = librosa.load(audio_path, sr=sr, mono=True)
+# Sample rate onset envelopes are computed at
+ONSET_SAMPLE_RATE = 48000
+
+# Onset envelope hop; alignment only needs ~20 ms frames, so this is
+# coarser than librosa's 512 default
+ONSET_HOP_LENGTH = 1024
+
+# Number of base envelopes (with their spectra) kept between alignments
+ENVELOPE_CACHE_SIZE = 16
+
+# Onset envelopes keyed by (audio_path, mtime), each paired with a dict of
+# its FFT spectra so repeated alignments against the same base skip the
+# FFT; least recently used first
+_envelope_fft_cache: "OrderedDict[Tuple[str, float], Tuple[np.ndarray, Dict[Tuple[int, int, int], np.ndarray]]]" = OrderedDict()
+
+
+@njit(cache=True, fastmath=True)
+def _zscore_inplace(x: np.ndarray) -> None:
+    """Z-score normalize x in place, gathering mean and std in a single pass."""
+    n = x.shape[0]
+    total = 0.0
+    total_sq = 0.0
+    for i in range(n):
+        total += x[i]
+        total_sq += x[i] * x[i]
+
+    mean = total / n
+    std = np.sqrt(max(total_sq / n - mean * mean, 0.0))
+
+    scale = 1.0 / (std + 1e-10)
+    for i in range(n):
+        x[i] = (x[i] - mean) * scale
+
+
+def onset_envelope_from_samples(
+    y: np.ndarray,
+    sr: int = ONSET_SAMPLE_RATE,
+    hop_length: int = ONSET_HOP_LENGTH
+) -> np.ndarray:
+    """Compute a z-scored float32 onset envelope from mono samples at sr."""
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+    onset_env = onset_env.astype(np.float32, copy=False)
 
-        # Compute onset envelope
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr)
+    if len(onset_env) > 0:
+        _zscore_inplace(onset_env)
 
-        # Z-score normalize
-        if len(onset_env) > 0:
-            onset_env = (onset_env - np.mean(onset_env)) / (np.std(onset_env) + 1e-10)
+    return onset_env
 
-        return onset_env
+
+def compute_onset_envelope(
+    audio_path: str,
+    sr: int = ONSET_SAMPLE_RATE,
+    hop_length: int = ONSET_HOP_LENGTH
+) -> np.ndarray:
+    """Compute onset envelope from audio file."""
+    try:
+        # Decode directly with soundfile and only resample when the
+        # native rate differs from the analysis rate
+        y, native_sr = sf.read(audio_path, dtype='float32', always_2d=False)
+        if y.ndim > 1:
+            y = np.mean(y, axis=1)
+        if native_sr != sr:
+            y = librosa.resample(y, orig_sr=native_sr, target_sr=sr)
+
+        return onset_envelope_from_samples(y, sr, hop_length)
 
     except Exception as e:
         print(f"❌ Error computing onset envelope for {audio_path}: {e}")
-        return np.array([])
+        return np.array([], dtype=np.float32)
+
+
+def _envelope_cache_path(audio_path: str, cache_dir: str, mtime_ns: int, size: int) -> Path:
+    """On-disk cache file for one version (mtime, size) of audio_path's onset envelope."""
+    path_hash = hashlib.sha1(os.path.abspath(audio_path).encode("utf-8")).hexdigest()[:12]
+    name = f"{Path(audio_path).stem}_{path_hash}_{mtime_ns}_{size}.onset_{ONSET_SAMPLE_RATE}_{ONSET_HOP_LENGTH}.npy"
+    return Path(cache_dir) / name
+
+
+def _load_envelope(audio_path: str, cache_dir: Optional[str]) -> np.ndarray:
+    """Decode audio_path and compute its onset envelope, via cache_dir's .npy files if given."""
+    cache_path = None
+    if cache_dir:
+        stat = os.stat(audio_path)
+        cache_path = _envelope_cache_path(audio_path, cache_dir, stat.st_mtime_ns, stat.st_size)
+        try:
+            return np.load(cache_path)
+        except (OSError, ValueError):
+            pass
+
+    samples = decode_audio_samples(audio_path, ONSET_SAMPLE_RATE)
+    if samples is None or len(samples) == 0:
+        return np.array([], dtype=np.float32)
+
+    envelope = onset_envelope_from_samples(samples)
+
+    if cache_path is not None and len(envelope) > 0:
+        # Write to a temporary name first so a worker reading the cache
+        # never sees a half-written file
+        try:
+            ensure_dir(cache_dir)
+            tmp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp.npy")
+            np.save(tmp_path, envelope)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠️  Could not cache onset envelope to {cache_path}: {e}")
+
+    return envelope
+
+
+def get_cached_envelope(
+    audio_path: str,
+    cache_dir: Optional[str] = None
+) -> Tuple[np.ndarray, Dict[Tuple[int, int, int], np.ndarray]]:
+    """
+    Return the onset envelope for audio_path and its FFT spectrum cache.
+
+    The audio is decoded in memory with decode_audio_samples, so
+    audio_path can be the base video itself. Results are memoized on
+    (path, mtime), keeping the ENVELOPE_CACHE_SIZE most recently used.
+    With cache_dir, envelopes are also persisted there as .npy files so
+    other processes (e.g. batch workers sharing a base video) skip the
+    decode too. Failed (empty) envelopes are not cached.
+    """
+    key = (audio_path, os.path.getmtime(audio_path))
+    if key in _envelope_fft_cache:
+        _envelope_fft_cache.move_to_end(key)
+        return _envelope_fft_cache[key]
+
+    envelope = _load_envelope(audio_path, cache_dir)
+    if len(envelope) == 0:
+        return envelope, {}
+
+    _envelope_fft_cache[key] = (envelope, {})
+    while len(_envelope_fft_cache) > ENVELOPE_CACHE_SIZE:
+        _envelope_fft_cache.popitem(last=False)
+
+    return _envelope_fft_cache[key]
+
+
+@njit(cache=True)
+def _ucorrelate(base: np.ndarray, overlay: np.ndarray, min_lag: int, max_lag: int) -> np.ndarray:
+    """Direct cross-correlation restricted to lags in [min_lag, max_lag]."""
+    n = base.shape[0]
+    m = overlay.shape[0]
+    out = np.zeros(max_lag - min_lag + 1)
+
+    for k in range(min_lag, max_lag + 1):
+        start = max(0, -k)
+        stop = min(m, n - k)
+        acc = 0.0
+        for i in range(start, stop):
+            acc += base[i + k] * overlay[i]
+        out[k - min_lag] = acc
+
+    return out
+
+
+def _direct_is_cheaper(num_lags: int, base_len: int, overlay_len: int) -> bool:
+    """Estimate whether a bounded direct correlation beats a full FFT one."""
+    direct_cost = num_lags * min(base_len, overlay_len)
+    fft_len = base_len + overlay_len
+    fft_cost = 3 * fft_len * np.log2(fft_len)
+    return direct_cost < fft_cost
 
 
 def cross_correlation_alignment(
     base_envelope: np.ndarray,
     overlay_envelope: np.ndarray,
     sr: int = 48000,
-    hop_length: int = 512
+    hop_length: int = ONSET_HOP_LENGTH,
+    max_lag_seconds: Optional[float] = None,
+    decimation: int = 4,
+    base_fft_cache: Optional[Dict[Tuple[int, int, int], np.ndarray]] = None
 ) -> Tuple[float, float]:
-    """Compute cross-correlation alignment between two onset envelopes."""
+    """
+    Compute cross-correlation alignment between two onset envelopes.
 
-    if len(base_envelope) == 0 or len(overlay_envelope) == 0:
-        return 0.0, 0.0
+    If max_lag_seconds is given, only offsets within +/- that window are
+    considered, which rejects spurious peaks at implausibly large lags.
 
-    # Compute cross-correlation
-    # Pad the shorter array to match the longer one
-    max_len = max(len(base_envelope), len(overlay_envelope))
+    Envelopes are decimated by the given factor before correlating; the
+    peak is then refined to sub-frame precision by parabolic interpolation.
 
-    if len(base_envelope) < max_len:
-        base_padded = np.pad(base_envelope, (0, max_len - len(base_envelope)))
-    else:
-        base_padded = base_envelope
+    base_fft_cache, if given, holds spectra of the base envelope keyed by
+    (applied decimation, base length, fft_len); it is read from and filled in so that aligning
+    several overlays against one base computes the base FFT only once.
+    """
 
-    if len(overlay_envelope) < max_len:
-        overlay_padded = np.pad(overlay_envelope, (0, max_len - len(overlay_envelope)))
-    else:
-        overlay_padded = overlay_envelope
+    if len(base_envelope) == 0 or len(overlay_envelope) == 0:
+        return 0.0, 0.0
 
-    # Compute cross-correlation
-    correlation = np.correlate(base_padded, overlay_padded, mode='full')
+    # Decimate envelopes - alignment tolerance is tens of milliseconds, far
+    # coarser than one onset frame, so correlate at a lower frame rate.
+    # Short envelopes skip it, so track the factor actually applied
+    applied_decimation = 1
+    if decimation > 1 and min(len(base_envelope), len(overlay_envelope)) > decimation * 16:
+        applied_decimation = decimation
+        base_envelope = decimate(base_envelope, decimation, ftype='fir', zero_phase=True)
+        overlay_envelope = decimate(overlay_envelope, decimation, ftype='fir', zero_phase=True)
+        hop_length = hop_length * decimation
+
+    # Single precision halves memory traffic and lets the FFT run in float32
+    base_envelope = np.asarray(base_envelope, dtype=np.float32)
+    overlay_envelope = np.asarray(overlay_envelope, dtype=np.float32)
+
+    base_len = len(base_envelope)
+    overlay_len = len(overlay_envelope)
+
+    # Full correlation covers lags -(overlay_len - 1) .. (base_len - 1);
+    # narrow that to the requested window
+    min_lag = -(overlay_len - 1)
+    max_lag = base_len - 1
+    if max_lag_seconds is not None:
+        max_lag_frames = int(max_lag_seconds * sr / hop_length)
+        min_lag = max(min_lag, -max_lag_frames)
+        max_lag = min(max_lag, max_lag_frames)
+
+    num_lags = max_lag - min_lag + 1
+
+    if num_lags < base_len + overlay_len - 1 and _direct_is_cheaper(num_lags, base_len, overlay_len):
+        # Small lag window - direct loop over the lags we care about
+        correlation = _ucorrelate(base_envelope, overlay_envelope, min_lag, max_lag)
+    elif choose_conv_method(base_envelope, overlay_envelope, mode='full') == 'direct':
+        # Short envelopes - scipy's size heuristic says direct beats FFT
+        correlation = correlate(base_envelope, overlay_envelope, mode='full', method='direct')
+        correlation = correlation[min_lag + overlay_len - 1:max_lag + overlay_len]
+    else:
+        # Compute cross-correlation via FFT (O(N log N) instead of O(N*M)):
+        # base * conj(overlay) in the frequency domain is the circular
+        # correlation, with negative lags wrapped to the end. No padding to a
+        # common length is needed; rfft zero-fills up to fft_len
+        fft_len = sp_fft.next_fast_len(base_len + overlay_len - 1, real=True)
+        cache_key = (applied_decimation, base_len, fft_len)
+
+        with sp_fft.set_workers(-1):
+            if base_fft_cache is not None and cache_key in base_fft_cache:
+                base_fft = base_fft_cache[cache_key]
+            else:
+                base_fft = sp_fft.rfft(base_envelope, n=fft_len)
+                if base_fft_cache is not None:
+                    base_fft_cache[cache_key] = base_fft
+
+            overlay_fft = sp_fft.rfft(overlay_envelope, n=fft_len)
+            circular = sp_fft.irfft(base_fft * np.conj(overlay_fft), n=fft_len)
+
+        correlation = np.concatenate((
+            circular[fft_len + min_lag:] if min_lag < 0 else circular[:0],
+            circular[max(min_lag, 0):max_lag + 1]
+        ))
 
     # Find the lag with maximum correlation
-    lag_samples = np.argmax(correlation) - (len(overlay_padded) - 1)
+    peak_idx = np.argmax(correlation)
+    lag_samples = min_lag + peak_idx
+
+    # Refine the peak with a parabola through its neighbours
+    if 0 < peak_idx < len(correlation) - 1:
+        y0, y1, y2 = correlation[peak_idx - 1:peak_idx + 2]
+        denom = y0 - 2 * y1 + y2
+        if denom != 0:
+            lag_samples += 0.5 * (y0 - y2) / denom
 
     # Convert lag from samples to seconds
     lag_seconds = lag_samples * hop_length / sr
 
     # Compute confidence as the ratio of peak to the product of norms
-    confidence = correlation[np.argmax(correlation)]
-    norm_product = np.linalg.norm(base_padded) * np.linalg.norm(overlay_padded)
-    confidence = confidence / (norm_product + 1e-10)
+    norm_product = np.linalg.norm(base_envelope) * np.linalg.norm(overlay_envelope)
+    confidence = correlation[peak_idx] / (norm_product + 1e-10)
 
-    return lag_seconds, confidence
+    return float(lag_seconds), float(confidence)
 
 
 def time_shift_audio(
@@ -100,13 +316,15 @@ def time_shift_audio(
         return run_ffmpeg_command(cmd, f"Delaying audio by {shift_seconds:.3f}s")
 
     elif direction == "advance" and shift_seconds < 0:
-        # Negative shift (advance) - use atrim and asetpts
+        # Negative shift (advance) - input seek, then trim from start.
+        # PCM WAV input can be stream-copied since every sample is a seek point
         shift_seconds = abs(shift_seconds)
+        audio_codec = "copy" if Path(input_path).suffix.lower() == ".wav" else "pcm_s16le"
         cmd = [
             "ffmpeg", "-y",
-            "-i", input_path,
             "-ss", str(shift_seconds),
-            "-c:a", "pcm_s16le",
+            "-i", input_path,
+            "-c:a", audio_codec,
             output_path
         ]
         return run_ffmpeg_command(cmd, f"Advancing audio by {shift_seconds:.3f}s")
@@ -124,16 +342,31 @@ def time_shift_audio(
 
 
 def align_audio(
-    base_audio_path: str,
+    base_audio_path: Optional[str],
     overlay_audio_path: str,
-    config: Dict[str, Any]
+    config: Dict[str, Any],
+    base_samples: Optional[np.ndarray] = None,
+    write_shifted: bool = True
 ) -> Dict[str, Any]:
-    """Align overlay audio with base audio using onset-based cross-correlation."""
+    """
+    Align overlay audio with base audio using onset-based cross-correlation.
 
-    print(f"🔄 Aligning {overlay_audio_path} with {base_audio_path}...")
+    The base can be given as an audio or video file, whose envelope (and
+    base FFT) is cached across alignments, or as mono samples at
+    ONSET_SAMPLE_RATE already decoded in memory. With
+    write_shifted=False no shifted WAV is written ("shifted_audio_path" is
+    None); the caller applies "original_offset" itself, e.g. through
+    composite_overlay's audio_offset.
+    """
+
+    base_label = base_audio_path if base_audio_path else "base audio samples"
+    print(f"🔄 Aligning {overlay_audio_path} with {base_label}...")
 
     # Extract onset envelopes
-    base_envelope = compute_onset_envelope(base_audio_path)
+    if base_samples is not None:
+        base_envelope, base_fft_cache = onset_envelope_from_samples(base_samples), {}
+    else:
+        base_envelope, base_fft_cache = get_cached_envelope(base_audio_path)
     overlay_envelope = compute_onset_envelope(overlay_audio_path)
 
     if len(base_envelope) == 0 or len(overlay_envelope) == 0:
@@ -144,7 +377,9 @@ def align_audio(
         # Compute alignment
         lag_seconds, confidence = cross_correlation_alignment(
             base_envelope,
-            overlay_envelope
+            overlay_envelope,
+            max_lag_seconds=config.get("slicing", {}).get("max_lag_seconds"),
+            base_fft_cache=base_fft_cache
         )
 
     # Check confidence threshold
@@ -157,8 +392,19 @@ def align_audio(
 
     print(f"📊 Alignment: {lag_seconds:+.3f}s offset, confidence: {confidence:.3f}")
 
+    result = {
+        "original_offset": lag_seconds,
+        "confidence": confidence,
+        "shifted_audio_path": None,
+        "base_envelope_shape": base_envelope.shape,
+        "overlay_envelope_shape": overlay_envelope.shape
+    }
+
+    if not write_shifted:
+        return result
+
     # Apply time shift to overlay audio
-    output_dir = Path(base_audio_path).parent
+    output_dir = Path(base_audio_path if base_audio_path else overlay_audio_path).parent
     base_name = Path(overlay_audio_path).stem
     shifted_path = output_dir / f"{base_name}_shifted.wav"
 
@@ -182,13 +428,8 @@ def align_audio(
     if not success:
         raise RuntimeError("Failed to apply time shift to overlay audio")
 
-    return {
-        "original_offset": lag_seconds,
-        "confidence": confidence,
-        "shifted_audio_path": str(shifted_path),
-        "base_envelope_shape": base_envelope.shape,
-        "overlay_envelope_shape": overlay_envelope.shape
-    }
+    result["shifted_audio_path"] = str(shifted_path)
+    return result
 
 
 def validate_audio_alignment(
@@ -220,11 +461,8 @@ def validate_audio_alignment(
     return True
 
 
-# Import here to avoid circular imports
 def get_audio_info(file_path: str) -> Dict[str, Any]:
     """Get audio file information."""
-    from .utils import run_ffprobe_command
-
     cmd = [
         "ffprobe",
         "-v", "quiet",
@@ -235,4 +473,4 @@ def get_audio_info(file_path: str) -> Dict[str, Any]:
         file_path
     ]
 
-    return run_ffprobe_command(cmd) or {}
\ No newline at end of file
+    return run_cached_ffprobe_command(cmd, file_path) or {}
\ No newline at end of file
@@ -1,16 +1,17 @@
 """Batch processing functionality for multiple videos (V2 Enhancement)."""
 
 import os
-import json
+import csv
+import multiprocessing
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 
 from .config import load_config
 from .io_ops import validate_file_exists, probe_media
-from .utils import ensure_dir
+from .utils import ensure_dir, write_json, start_log_listener, install_queue_logging
 
 
 class BatchJob:
@@ -50,6 +51,38 @@ class BatchJob:
         }
 
 
+def _init_batch_worker(
+    log_queue: Any,
+    worker_slots: Any,
+    cores: List[int],
+    cores_per_worker: int
+) -> None:
+    """
+    Process pool initializer for batch workers.
+
+    Sends the worker's log records to the parent's listener and, where the
+    OS supports it (Linux), pins the worker to its own block of cores so
+    jobs' ffmpeg children (which inherit the affinity) don't migrate
+    between each other's cores.
+    """
+    install_queue_logging(log_queue)
+
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return
+
+    with worker_slots.get_lock():
+        slot = worker_slots.value
+        worker_slots.value += 1
+
+    start = slot * cores_per_worker
+    pinned = {cores[(start + i) % len(cores)] for i in range(cores_per_worker)}
+
+    try:
+        os.sched_setaffinity(0, pinned)
+    except OSError:
+        pass
+
+
 class BatchProcessor:
     """Process multiple videos in batch with inheritance."""
 
@@ -57,11 +90,13 @@ class BatchProcessor:
         self,
         base_preset: str,
         output_root: str,
-        max_workers: int = 2
+        max_workers: int = 2,
+        pin_cores: bool = True
     ):
         self.base_preset = base_preset
         self.output_root = output_root
         self.max_workers = max_workers
+        self.pin_cores = pin_cores
         self.jobs: List[BatchJob] = []
 
     def add_job(
@@ -134,20 +169,40 @@ class BatchProcessor:
 
         return validation_results
 
-    def process_single_job(self, job: BatchJob) -> Dict[str, Any]:
-        """Process a single batch job."""
+    def process_single_job(
+        self,
+        job: BatchJob,
+        threads: int = 0,
+        encode_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Process a single batch job.
+
+        threads caps each of its ffmpeg exports (0 = auto) and encode_workers
+        sets how many exports run at once (None = the CLI default).
+        """
         from .cli import process_video
 
         try:
             job.status = "processing"
 
+            # Jobs run in separate processes, so base onset envelopes are
+            # shared through .npy files under the batch output root
+            pipeline_options = {
+                "threads": threads,
+                "envelope_cache_dir": str(Path(self.output_root) / ".onset_cache")
+            }
+            if encode_workers is not None:
+                pipeline_options["encode_workers"] = encode_workers
+
             result = process_video(
                 base=job.base_video,
                 overlay_video=job.overlay_video,
                 overlay_audio=job.overlay_audio,
                 out=job.output_dir,
                 preset=job.preset,
-                manifest=True
+                manifest=True,
+                **pipeline_options
             )
 
             job.status = "completed"
@@ -189,30 +244,76 @@ class BatchProcessor:
                 "results": []
             }
 
-        print(f"\n🚀 Processing {len(valid_jobs)} valid jobs with {self.max_workers} workers...")
+        # Cores this process may actually run on (a container or taskset
+        # can restrict it below cpu_count)
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            cores = list(range(os.cpu_count() or 1))
+
+        workers = max(1, min(self.max_workers, len(valid_jobs), len(cores)))
+
+        # Split the cores into one block per job and each block between the
+        # job's export workers, so a job's ffmpeg threads fit its own block
+        # (and the composite, at threads * export workers, does too)
+        cores_per_worker = max(1, len(cores) // workers)
+        job_encode_workers = max(1, cores_per_worker // 2)
+        job_threads = max(1, cores_per_worker // job_encode_workers)
+
+        print(f"\n🚀 Processing {len(valid_jobs)} valid jobs with {workers} workers ({job_threads} ffmpeg threads each)...")
 
         results = []
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {
-                executor.submit(self.process_single_job, job): job
-                for job in valid_jobs
-            }
+        # Jobs are CPU-heavy Python (librosa, correlation), so run them in
+        # separate processes; spawn avoids fork-related OpenMP deadlocks.
+        # Their ffmpeg/probe diagnostics are queued back to this process
+        # and written by a single listener.
+        mp_context = multiprocessing.get_context("spawn")
+        log_queue, log_listener = start_log_listener(mp_context)
+
+        # Each worker is pinned to its block of those cores (an empty list
+        # skips pinning)
+        pinned_cores = cores if self.pin_cores else []
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=mp_context,
+                initializer=_init_batch_worker,
+                initargs=(log_queue, mp_context.Value("i", 0), pinned_cores, cores_per_worker)
+            ) as executor:
+                futures = {
+                    executor.submit(self.process_single_job, job, job_threads, job_encode_workers): job
+                    for job in valid_jobs
+                }
+
+                with tqdm(total=len(valid_jobs), desc="Batch processing") as pbar:
+                    for future in as_completed(futures):
+                        job = futures[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {
+                                "job_id": job.job_id,
+                                "status": "error",
+                                "error": str(e)
+                            }
+                        finally:
+                            pbar.update(1)
+
+                        # Workers mutate their own copy of the job, so mirror
+                        # the outcome back onto ours
+                        if result["status"] == "success":
+                            job.status = "completed"
+                            job.result = result["result"]
+                        else:
+                            job.status = "failed"
+                            job.error = result["error"]
 
-            with tqdm(total=len(valid_jobs), desc="Batch processing") as pbar:
-                for future in as_completed(futures):
-                    job = futures[future]
-                    try:
-                        result = future.result()
                         results.append(result)
-                    except Exception as e:
-                        results.append({
-                            "job_id": job.job_id,
-                            "status": "error",
-                            "error": str(e)
-                        })
-                    finally:
-                        pbar.update(1)
+        finally:
+            # Flush whatever the workers queued, even if the pool broke
+            log_listener.stop()
 
         completed = sum(1 for r in results if r["status"] == "success")
         failed = sum(1 for r in results if r["status"] == "error")
@@ -228,8 +329,7 @@ class BatchProcessor:
         manifest_path = Path(self.output_root) / f"batch_manifest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         ensure_dir(self.output_root)
 
-        with open(manifest_path, 'w') as f:
-            json.dump(summary, f, indent=2)
+        write_json(summary, str(manifest_path))
 
         print(f"\n✅ Batch complete: {completed} succeeded, {failed} failed")
         print(f"📄 Manifest: {manifest_path}")
@@ -252,23 +352,13 @@ class BatchProcessor:
         Returns:
             Number of jobs loaded
         """
-        import csv
-
         loaded = 0
 
         try:
-            with open(csv_path, 'r') as f:
-                reader = csv.DictReader(f)
-
-                for row in reader:
-                    base_video = row.get('base_video', '').strip()
-                    overlay_video = row.get('overlay_video', '').strip()
-                    overlay_audio = row.get('overlay_audio', '').strip()
-                    preset = row.get('preset', '').strip() or base_preset or self.base_preset
-
-                    if base_video and overlay_video and overlay_audio:
-                        self.add_job(base_video, overlay_video, overlay_audio, preset)
-                        loaded += 1
+            for base_video, overlay_video, overlay_audio, preset in _read_job_rows(csv_path):
+                preset = preset or base_preset or self.base_preset
+                self.add_job(base_video, overlay_video, overlay_audio, preset)
+                loaded += 1
 
             print(f"📄 Loaded {loaded} jobs from {csv_path}")
 
@@ -278,6 +368,34 @@ class BatchProcessor:
         return loaded
 
 
+CSV_COLUMNS = ["base_video", "overlay_video", "overlay_audio", "preset"]
+
+
+def _read_job_rows(csv_path: str) -> List[Tuple[str, str, str, str]]:
+    """
+    Read stripped (base_video, overlay_video, overlay_audio, preset) rows
+    from a batch CSV, dropping rows that are missing any input.
+
+    Uses pandas for vectorized parsing when installed, csv otherwise.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        with open(csv_path, 'r') as f:
+            rows = [
+                tuple((row.get(column) or '').strip() for column in CSV_COLUMNS)
+                for row in csv.DictReader(f)
+            ]
+        return [row for row in rows if all(row[:3])]
+
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    df = df.reindex(columns=CSV_COLUMNS, fill_value='').apply(lambda col: col.str.strip())
+
+    mask = (df['base_video'] != '') & (df['overlay_video'] != '') & (df['overlay_audio'] != '')
+
+    return list(df[mask].itertuples(index=False, name=None))
+
+
 def discover_videos_in_folder(
     folder_path: str,
     extensions: List[str] = None
@@ -301,11 +419,15 @@ def discover_videos_in_folder(
         print(f"❌ Folder not found: {folder_path}")
         return []
 
-    videos = []
+    exts = {ext.lower() for ext in extensions}
 
-    for ext in extensions:
-        videos.extend(folder.glob(f"*{ext}"))
-        videos.extend(folder.glob(f"*{ext.upper()}"))
+    # One directory sweep, matching extensions case-insensitively
+    with os.scandir(folder) as entries:
+        videos = [
+            Path(entry.path)
+            for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in exts and entry.is_file()
+        ]
 
     return [str(v) for v in sorted(videos)]
 
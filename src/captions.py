@@ -2,20 +2,56 @@
 
 import subprocess
 import json
+import re
+import functools
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from datetime import timedelta
+
+import numpy as np
+
+from .utils import run_ffmpeg_command
+
+
+@functools.lru_cache(maxsize=4)
+def _get_whisper_model(model_size: str, device: Optional[str] = None):
+    """Load a Whisper model once per (model_size, device) and reuse it."""
+    import whisper
+
+    if device is None:
+        import torch
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    return whisper.load_model(model_size, device=device)
+
+
+# One cue: index, timing line and text. The text has to start on the line
+# right after the timing, so a cue with no text is skipped (as splitting on
+# blank lines did) instead of swallowing the next cue
+_SRT_BLOCK_RE = re.compile(
+    r"^\d+\n"
+    r"(\d+):(\d+):(\d+),(\d+)\s*-->\s*(\d+):(\d+):(\d+),(\d+)[^\n]*\n"
+    r"([^\n][\s\S]*?)(?=\n\n|\Z)",
+    re.MULTILINE
+)
+
+
+def format_timestamps_srt(seconds: np.ndarray) -> List[str]:
+    """Format an array of timestamps for SRT subtitle format."""
+    total_ms = np.rint(np.asarray(seconds, dtype=np.float64) * 1000).astype(np.int64)
+
+    hours, remainder = np.divmod(total_ms, 3600000)
+    minutes, remainder = np.divmod(remainder, 60000)
+    secs, millis = np.divmod(remainder, 1000)
+
+    return [
+        f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+        for h, m, s, ms in zip(hours.tolist(), minutes.tolist(), secs.tolist(), millis.tolist())
+    ]
 
 
 def format_timestamp_srt(seconds: float) -> str:
     """Format timestamp for SRT subtitle format."""
-    td = timedelta(seconds=seconds)
-    hours = int(td.total_seconds() // 3600)
-    minutes = int((td.total_seconds() % 3600) // 60)
-    secs = int(td.total_seconds() % 60)
-    millis = int((td.total_seconds() % 1) * 1000)
-
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    return format_timestamps_srt(np.array([seconds]))[0]
 
 
 def generate_captions_whisper(
@@ -37,11 +73,9 @@ def generate_captions_whisper(
         Path to generated SRT file
     """
     try:
-        import whisper
-
         print(f"🎤 Transcribing audio with Whisper ({model_size} model)...")
 
-        model = whisper.load_model(model_size)
+        model = _get_whisper_model(model_size)
 
         result = model.transcribe(
             audio_path,
@@ -52,11 +86,15 @@ def generate_captions_whisper(
 
         output_path = Path(output_dir) / f"{Path(audio_path).stem}.srt"
 
+        segments = result['segments']
+        starts = format_timestamps_srt(np.array([segment['start'] for segment in segments]))
+        ends = format_timestamps_srt(np.array([segment['end'] for segment in segments]))
+
         with open(output_path, 'w', encoding='utf-8') as f:
-            for i, segment in enumerate(result['segments'], 1):
-                f.write(f"{i}\n")
-                f.write(f"{format_timestamp_srt(segment['start'])} --> {format_timestamp_srt(segment['end'])}\n")
-                f.write(f"{segment['text'].strip()}\n\n")
+            f.write(''.join(
+                f"{i}\n{start} --> {end}\n{segment['text'].strip()}\n\n"
+                for i, (segment, start, end) in enumerate(zip(segments, starts, ends), 1)
+            ))
 
         print(f"✅ Generated captions: {output_path}")
 
@@ -70,6 +108,12 @@ def generate_captions_whisper(
         return None
 
 
+def _hex_to_ass_bgr(color: str) -> str:
+    """Convert an #RRGGBB colour to the BBGGRR byte order ASS styles expect."""
+    rgb = int(color.lstrip('#'), 16)
+    return f"{rgb & 0xFF:02X}{(rgb >> 8) & 0xFF:02X}{(rgb >> 16) & 0xFF:02X}"
+
+
 def create_caption_style(config: Dict[str, Any]) -> str:
     """
     Create FFmpeg subtitle style from configuration.
@@ -86,14 +130,14 @@ def create_caption_style(config: Dict[str, Any]) -> str:
     stroke_color = colors.get("stroke", "#000000")
     stroke_width = colors.get("stroke_width", 2)
 
-    primary_hex = primary_color.lstrip('#')
-    stroke_hex = stroke_color.lstrip('#')
+    primary_bgr = _hex_to_ass_bgr(primary_color)
+    stroke_bgr = _hex_to_ass_bgr(stroke_color)
 
     style = (
         f"FontName={font_name},"
         f"FontSize=48,"
-        f"PrimaryColour=&H{primary_hex[::-1]}&,"
-        f"OutlineColour=&H{stroke_hex[::-1]}&,"
+        f"PrimaryColour=&H{primary_bgr}&,"
+        f"OutlineColour=&H{stroke_bgr}&,"
         f"BorderStyle=3,"
         f"Outline={stroke_width},"
         f"Shadow=0,"
@@ -122,8 +166,6 @@ def burn_captions(
     Returns:
         Success status
     """
-    from .utils import run_ffmpeg_command
-
     style = create_caption_style(config)
 
     subtitle_filter = f"subtitles={srt_path}:force_style='{style}'"
@@ -155,11 +197,9 @@ def generate_word_level_captions(
         List of word dictionaries with timestamps
     """
     try:
-        import whisper
-
         print(f"🎤 Generating word-level captions...")
 
-        model = whisper.load_model(model_size)
+        model = _get_whisper_model(model_size)
 
         result = model.transcribe(
             audio_path,
@@ -239,41 +279,27 @@ def extract_caption_snippets(
         with open(srt_path, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        segments = content.strip().split('\n\n')
-
-        relevant_segments = []
-        segment_index = 1
-
-        for segment in segments:
-            lines = segment.split('\n')
-            if len(lines) < 3:
-                continue
-
-            time_line = lines[1]
-            if '-->' not in time_line:
-                continue
-
-            start_str, end_str = time_line.split('-->')
-
-            def parse_srt_time(time_str):
-                time_str = time_str.strip()
-                h, m, rest = time_str.split(':')
-                s, ms = rest.split(',')
-                return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
-
-            seg_start = parse_srt_time(start_str)
-            seg_end = parse_srt_time(end_str)
-
-            if seg_end >= start_time and seg_start <= end_time:
-                adjusted_start = max(0, seg_start - start_time)
-                adjusted_end = min(end_time - start_time, seg_end - start_time)
-
-                new_segment = f"{segment_index}\n"
-                new_segment += f"{format_timestamp_srt(adjusted_start)} --> {format_timestamp_srt(adjusted_end)}\n"
-                new_segment += '\n'.join(lines[2:])
-
-                relevant_segments.append(new_segment)
-                segment_index += 1
+        blocks = _SRT_BLOCK_RE.findall(content.strip())
+        if not blocks:
+            return ""
+
+        # Columns: start h/m/s/ms, end h/m/s/ms
+        times = np.array([block[:8] for block in blocks], dtype=np.int64)
+        seg_starts = times[:, 0] * 3600 + times[:, 1] * 60 + times[:, 2] + times[:, 3] / 1000
+        seg_ends = times[:, 4] * 3600 + times[:, 5] * 60 + times[:, 6] + times[:, 7] / 1000
+
+        selected = np.flatnonzero((seg_ends >= start_time) & (seg_starts <= end_time))
+        adjusted_starts = np.maximum(0, seg_starts[selected] - start_time)
+        adjusted_ends = np.minimum(end_time - start_time, seg_ends[selected] - start_time)
+
+        relevant_segments = [
+            f"{segment_index}\n{start} --> {end}\n{blocks[block_idx][8]}"
+            for segment_index, (block_idx, start, end) in enumerate(zip(
+                selected,
+                format_timestamps_srt(adjusted_starts),
+                format_timestamps_srt(adjusted_ends)
+            ), 1)
+        ]
 
         return '\n\n'.join(relevant_segments)
 
@@ -1,29 +1,33 @@
 """Command-line interface for Keo Shortform Factory."""
 
 import os
-import json
+import queue
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Dict, Any, Tuple
 
 import typer
 import yaml
 from tqdm import tqdm
 
 from .config import load_config, get_default_config
-from .io_ops import validate_media_compatibility, probe_media, extract_audio, prepare_overlay_audio
-from .utils import validate_file_exists
-from .audio_align import align_audio
-from .video_ops import replace_audio, composite_overlay
-from .cutter import slice_video, generate_clip_starts
-from .exporter import export_clips
+from .io_ops import validate_media_compatibility, probe_media, prepare_overlay_audio
+from .utils import validate_file_exists, set_ffmpeg_priority, write_json
+from .audio_align import align_audio, get_cached_envelope
+from .video_ops import composite_overlay
+from .cutter import generate_clip_starts, iter_clips
+from .exporter import export_clips, slice_and_export, build_export_filter, ratio_matches
 from .scenes import detect_scenes, merge_scenes_with_windows
 from .hook_finder import find_hooks, bias_starts_to_hooks
 from .captions import generate_captions_whisper, burn_captions
 
 app = typer.Typer()
 
+DEFAULT_PRESET = "presets/tiktok_vertical.yaml"
+DEFAULT_ENCODE_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
 
 @app.command("process")
 @app.command()
@@ -32,7 +36,7 @@ def main(
     overlay_video: str = typer.Option(..., "--overlay-video", "-ov", help="Path to overlay video"),
     overlay_audio: str = typer.Option(..., "--overlay-audio", "-oa", help="Path to overlay audio"),
     out: str = typer.Option(..., "--out", "-o", help="Output directory"),
-    preset: str = typer.Option("presets/tiktok_vertical.yaml", "--preset", "-p", help="Path to preset config file"),
+    preset: str = typer.Option(DEFAULT_PRESET, "--preset", "-p", help="Path to preset config file"),
     clip_len: int = typer.Option(20, "--clip-len", "-l", help="Clip length in seconds"),
     clip_stride: int = typer.Option(18, "--clip-stride", "-s", help="Clip stride in seconds"),
     scene_detect: bool = typer.Option(False, "--scene-detect", help="Enable scene detection for better cuts"),
@@ -44,22 +48,94 @@ def main(
     opacity: float = typer.Option(0.9, "--opacity", help="Overlay opacity"),
     dry_run: bool = typer.Option(False, "--dry-run", help="Show plan without executing"),
     manifest: bool = typer.Option(True, "--manifest", help="Write manifest JSON"),
+    encode_workers: int = typer.Option(
+        DEFAULT_ENCODE_WORKERS, "--encode-workers", help="Number of parallel ffmpeg cut/export jobs"
+    ),
+    threads: int = typer.Option(
+        0, "--threads", help="Threads per ffmpeg export (0 = share the CPU cores across encode workers)"
+    ),
+    nice: int = typer.Option(10, "--nice", help="Niceness for ffmpeg processes (0 = normal priority)"),
+    keep_intermediate: bool = typer.Option(
+        False, "--keep-intermediate", help="Also keep stream-copied source clips in clips_src (for debugging)"
+    ),
 ):
     """Create short-form videos from long-form content with overlay audio and video."""
+    return _run_pipeline(
+        base=base,
+        overlay_video=overlay_video,
+        overlay_audio=overlay_audio,
+        out=out,
+        preset=preset,
+        clip_len=clip_len,
+        clip_stride=clip_stride,
+        scene_detect=scene_detect,
+        hook_detect=hook_detect,
+        captions=captions,
+        min_conf=min_conf,
+        ratio=ratio,
+        position=position,
+        opacity=opacity,
+        dry_run=dry_run,
+        manifest=manifest,
+        encode_workers=encode_workers,
+        threads=threads,
+        nice=nice,
+        keep_intermediate=keep_intermediate
+    )
+
+
+def _run_pipeline(
+    base: str,
+    overlay_video: str,
+    overlay_audio: str,
+    out: str,
+    preset: str = DEFAULT_PRESET,
+    clip_len: int = 20,
+    clip_stride: int = 18,
+    scene_detect: bool = False,
+    hook_detect: bool = False,
+    captions: bool = False,
+    min_conf: float = 0.15,
+    ratio: str = "9:16",
+    position: str = "top-right",
+    opacity: float = 0.9,
+    dry_run: bool = False,
+    manifest: bool = True,
+    encode_workers: int = DEFAULT_ENCODE_WORKERS,
+    threads: int = 0,
+    nice: int = 10,
+    keep_intermediate: bool = False,
+    envelope_cache_dir: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Run the full pipeline on one base video and return its session manifest.
+
+    Plain-Python entry point shared by the Typer command and process_video,
+    so batch jobs don't go through Typer's option handling. Batches pass
+    envelope_cache_dir so jobs sharing a base video reuse its onset envelope.
+    """
 
     # Create output directory with timestamp
     session_dir = Path(str(out)) / f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     clips_src_dir = session_dir / "clips_src"
     exports_dir = session_dir / "exports" / str(ratio).replace(":", "x")
 
+    # String forms of the input and session paths, converted once
+    base_str, overlay_video_str, overlay_audio_str = str(base), str(overlay_video), str(overlay_audio)
+    preset_str = str(preset)
+    session_str, clips_src_str, exports_str = str(session_dir), str(clips_src_dir), str(exports_dir)
+
+    set_ffmpeg_priority(nice)
+
     if not dry_run:
         session_dir.mkdir(parents=True, exist_ok=True)
-        clips_src_dir.mkdir(parents=True, exist_ok=True)
+        if keep_intermediate:
+            clips_src_dir.mkdir(parents=True, exist_ok=True)
         exports_dir.mkdir(parents=True, exist_ok=True)
 
     # Load or create config
-    if Path(str(preset)).exists():
-        config = load_config(preset)
+    if Path(preset_str).exists():
+        config = load_config(preset_str)
     else:
         typer.echo(f"Preset file {preset} not found, using defaults")
         config = get_default_config()
@@ -77,9 +153,9 @@ def main(
 
     # Validate inputs
     typer.echo("🔍 Validating inputs...")
-    base_valid = validate_file_exists(str(base), "base video")
-    overlay_video_valid = validate_file_exists(str(overlay_video), "overlay video")
-    overlay_audio_valid = validate_file_exists(str(overlay_audio), "overlay audio")
+    base_valid = validate_file_exists(base_str, "base video")
+    overlay_video_valid = validate_file_exists(overlay_video_str, "overlay video")
+    overlay_audio_valid = validate_file_exists(overlay_audio_str, "overlay audio")
 
     if not (base_valid and overlay_video_valid and overlay_audio_valid):
         raise ValueError("One or more input files are invalid")
@@ -93,57 +169,83 @@ def main(
 
     # Probe media for detailed info
     typer.echo("📊 Probing media files...")
-    base_probe = probe_media(str(base))
-    overlay_audio_probe = probe_media(str(overlay_audio))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        base_probe_future = executor.submit(probe_media, base_str)
+        overlay_audio_probe_future = executor.submit(probe_media, overlay_audio_str)
+        base_probe = base_probe_future.result()
+        overlay_audio_probe = overlay_audio_probe_future.result()
 
     # Validate media compatibility
     validate_media_compatibility(base_probe, overlay_audio_probe)
 
-    # Extract and prepare audio files
+    # Prepare audio - the base onset envelope (decoded in memory, and
+    # reused when a batch worker sees the same base again) and the overlay
+    # normalization are independent, so run them side by side
     typer.echo("🎵 Preparing audio files...")
-    base_audio_path = extract_audio(str(base), str(session_dir))
-    overlay_audio_path = prepare_overlay_audio(str(overlay_audio), str(session_dir), config.get("target_lufs", -14))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        base_envelope_future = executor.submit(get_cached_envelope, base_str, envelope_cache_dir)
+        overlay_audio_future = executor.submit(
+            prepare_overlay_audio, overlay_audio_str, session_str, config.get("target_lufs", -14)
+        )
+        base_envelope, _ = base_envelope_future.result()
+        overlay_audio_path = overlay_audio_future.result()
+
+    if len(base_envelope) == 0:
+        raise RuntimeError(f"Failed to extract audio from {base_str}")
 
-    # Align audio
+    # Align audio against the cached base envelope
     typer.echo("🎵 Aligning overlay audio with base video...")
     alignment_result = align_audio(
-        base_audio_path=base_audio_path,
+        base_audio_path=base_str,
         overlay_audio_path=overlay_audio_path,
-        config=config
+        config=config,
+        write_shifted=False
     )
 
-    # Replace audio in base video
-    typer.echo("🎬 Replacing base audio with aligned overlay...")
-    video_with_audio = session_dir / "video_with_audio.mp4"
-    from .video_ops import replace_audio, composite_overlay
-    replace_audio(
-        video_path=str(base),
-        audio_path=alignment_result["shifted_audio_path"],
-        output_path=str(video_with_audio),
-        config=config
-    )
+    # Scene detection only depends on frame timing, which compositing
+    # doesn't change, so run it on the base video in the background
+    scene_executor = None
+    scene_future = None
+    if scene_detect:
+        scene_executor = ThreadPoolExecutor(max_workers=1)
+        scene_future = scene_executor.submit(
+            detect_scenes, base_str, threshold=30.0, min_scene_len=2.0
+        )
 
-    # Composite overlay video
-    typer.echo("🎭 Compositing overlay video...")
+    # Composite overlay video, swapping in the aligned audio in the same pass
+    typer.echo("🎭 Compositing overlay video with aligned audio...")
     master_video = session_dir / "master.mp4"
+    master_str = str(master_video)
     composite_overlay(
-        base_video_path=str(video_with_audio),
-        overlay_video_path=str(overlay_video),
-        output_path=str(master_video),
-        config=config
+        base_video_path=base_str,
+        overlay_video_path=overlay_video_str,
+        output_path=master_str,
+        config=config,
+        audio_path=overlay_audio_path,
+        audio_offset=alignment_result["original_offset"],
+        # The composite runs alone, so it gets every export worker's share
+        # of the cores (left to ffmpeg when nothing caps the threads)
+        threads=threads * max(1, encode_workers) if threads > 0 else None
     )
 
     # Slice into clips with optional scene detection and hook finding
     typer.echo("✂️  Slicing master video into clips...")
 
     # Generate base clip starts
-    duration = probe_media(str(master_video))["duration"]
+    master_probe = probe_media(master_str)
+    duration = master_probe["duration"]
+
+    # A master that already has the export aspect ratio only needs its
+    # clips stream-copied, not re-encoded
+    master_width, master_height = map(int, master_probe.get("resolution", "0x0").split("x"))
+    config["export"]["stream_copy"] = ratio_matches(master_width, master_height, ratio)
     window_starts = generate_clip_starts(duration, clip_len, clip_stride)
 
     # Apply scene detection if enabled
     if scene_detect:
         typer.echo("🎬 Applying scene detection...")
-        scene_times = detect_scenes(str(master_video), threshold=30.0, min_scene_len=2.0)
+        scene_times = scene_future.result()
+        scene_executor.shutdown()
         window_starts = merge_scenes_with_windows(
             scene_times, window_starts, clip_len, max_clips=None
         )
@@ -152,83 +254,91 @@ def main(
     if hook_detect:
         typer.echo("🎯 Finding engaging hooks...")
         hooks = find_hooks(
-            alignment_result["shifted_audio_path"],
+            master_str,
             duration,
             clip_len=clip_len,
             num_hooks=len(window_starts)
         )
         window_starts = bias_starts_to_hooks(window_starts, hooks, attraction_radius=5.0)
 
-    # Create clips from optimized start times
-    from .cutter import create_clip
-    clips = []
-    for i, start_time in enumerate(window_starts):
-        clip_path = create_clip(
-            str(master_video),
-            str(clips_src_dir),
-            start_time,
-            clip_len,
-            i
-        )
-        if clip_path:
-            clips.append(clip_path)
-
     # Generate captions if enabled
     captions_path = None
     if captions:
         typer.echo("🎤 Generating captions...")
         captions_path = generate_captions_whisper(
-            alignment_result["shifted_audio_path"],
-            str(session_dir),
+            master_str,
+            session_str,
             model_size="base",
             language="en"
         )
         if captions_path:
             typer.echo(f"✅ Captions generated: {captions_path}")
 
-    # Export in target ratio
-    typer.echo(f"📤 Exporting {len(clips)} clips in {ratio} ratio...")
-    exported_clips = []
-    for clip in tqdm(clips, desc="Exporting"):
-        exported_path = export_clips(
-            clip_path=clip,
-            output_dir=str(exports_dir),
-            config=config
+    # Cut clips from optimized start times and export them in target ratio
+    typer.echo(f"📤 Cutting and exporting {len(window_starts)} clips in {ratio} ratio...")
+    # Unless told otherwise, each export is capped to its share of the cores
+    # so the pool doesn't oversubscribe the CPU
+    encode_workers = max(1, encode_workers)
+    encode_threads = threads if threads > 0 else max(1, (os.cpu_count() or 1) // encode_workers)
+    if keep_intermediate:
+        # Two-stage path: stream-copy each clip, then export it as soon as
+        # it has been cut
+        clips, exported_clips = _cut_and_export(
+            master_str,
+            clips_src_str,
+            exports_str,
+            window_starts,
+            clip_len,
+            config,
+            encode_workers,
+            encode_threads
+        )
+    else:
+        clips = []
+        exported_clips = slice_and_export(
+            master_str,
+            window_starts,
+            clip_len,
+            exports_str,
+            config,
+            max_workers=encode_workers,
+            threads=encode_threads
         )
-        exported_clips.append(exported_path)
 
-    # Write manifest
-    if manifest:
-        manifest_data = {
-            "session_id": session_dir.name,
-            "created_at": datetime.now().isoformat(),
-            "inputs": {
-                "base_video": base,
-                "overlay_video": overlay_video,
-                "overlay_audio": overlay_audio,
-            },
-            "config": config,
-            "features": {
-                "scene_detection": scene_detect,
-                "hook_detection": hook_detect,
-                "captions": captions
-            },
-            "alignment": alignment_result,
-            "processing": {
-                "master_video": str(master_video),
-                "clips_count": len(clips),
-                "exports_count": len(exported_clips),
-                "captions_file": captions_path
-            },
-            "outputs": {
-                "clips_src": [str(c) for c in clips],
-                "exports": [str(e) for e in exported_clips],
-            }
+    manifest_data = {
+        "session_id": session_dir.name,
+        "created_at": datetime.now().isoformat(),
+        "inputs": {
+            "base_video": base,
+            "overlay_video": overlay_video,
+            "overlay_audio": overlay_audio,
+        },
+        "config": config,
+        "features": {
+            "scene_detection": scene_detect,
+            "hook_detection": hook_detect,
+            "captions": captions
+        },
+        "alignment": alignment_result,
+        "processing": {
+            "master_video": master_str,
+            # Clip windows cut from the master (each is exported directly
+            # unless --keep-intermediate writes it to clips_src first)
+            "clips_count": len(clips) if keep_intermediate else len(window_starts),
+            "exports_count": len(exported_clips),
+            "captions_file": captions_path
+        },
+        "outputs": {
+            "exports": list(map(str, exported_clips)),
         }
+    }
+
+    if keep_intermediate:
+        manifest_data["outputs"]["clips_src"] = list(map(str, clips))
 
-        manifest_path = session_dir / "manifest.json"
-        with open(manifest_path, "w") as f:
-            json.dump(manifest_data, f, indent=2)
+    # Write manifest
+    if manifest:
+        write_json(manifest_data, str(session_dir / "manifest.json"))
 
     typer.echo(f"✅ Complete! Processed into {len(exported_clips)} clips")
     typer.echo(f"📁 Output: {session_dir}")
@@ -236,13 +346,80 @@ def main(
     return manifest_data
 
 
+def _cut_and_export(
+    master_video: str,
+    clips_dir: str,
+    exports_dir: str,
+    window_starts: List[float],
+    clip_len: float,
+    config: Dict[str, Any],
+    workers: int,
+    threads: int
+) -> Tuple[List[str], List[str]]:
+    """
+    Cut and export clips as a producer/consumer pipeline.
+
+    One thread cuts clips and queues them; `workers` threads export clips
+    off the queue while later ones are still being cut. The bounded queue
+    keeps at most a few un-exported clips waiting on disk.
+    """
+
+    clip_queue: "queue.Queue[Optional[Tuple[int, str]]]" = queue.Queue(maxsize=4)
+    clips: List[str] = []
+    exported: Dict[int, str] = {}
+
+    # Every clip is cut from the same master, so the crop/scale filter is
+    # built once rather than re-probed per clip
+    scale_filter = None
+    if not config.get("export", {}).get("stream_copy"):
+        scale_filter = build_export_filter(master_video, config)
+
+    def produce() -> None:
+        try:
+            for clip_path in iter_clips(master_video, clips_dir, window_starts, clip_len):
+                clip_queue.put((len(clips), clip_path))
+                clips.append(clip_path)
+        finally:
+            for _ in range(workers):
+                clip_queue.put(None)
+
+    def consume(pbar: tqdm) -> None:
+        while True:
+            item = clip_queue.get()
+            if item is None:
+                return
+
+            index, clip_path = item
+            try:
+                exported[index] = export_clips(
+                    clip_path=clip_path,
+                    output_dir=exports_dir,
+                    config=config,
+                    threads=threads,
+                    scale_filter=scale_filter
+                )
+            except Exception as e:
+                typer.echo(f"❌ Failed to export {clip_path}: {e}")
+                exported[index] = ""
+            pbar.update(1)
+
+    with tqdm(total=len(window_starts), desc="Exporting") as pbar:
+        with ThreadPoolExecutor(max_workers=workers + 1) as executor:
+            futures = [executor.submit(produce)]
+            futures += [executor.submit(consume, pbar) for _ in range(workers)]
+            for future in futures:
+                future.result()
+
+    return clips, [exported[i] for i in range(len(clips))]
+
+
 @app.command("batch")
 def batch_process(
     csv: str = typer.Option(None, "--csv", "-c", help="CSV file with batch jobs"),
     folder: str = typer.Option(None, "--folder", "-f", help="Folder with base videos"),
     overlay_video: str = typer.Option(None, "--overlay-video", "-ov", help="Overlay video (for folder mode)"),
     overlay_audio: str = typer.Option(None, "--overlay-audio", "-oa", help="Overlay audio (for folder mode)"),
-    preset: str = typer.Option("presets/tiktok_vertical.yaml", "--preset", "-p", help="Default preset"),
+    preset: str = typer.Option(DEFAULT_PRESET, "--preset", "-p", help="Default preset"),
     out: str = typer.Option(..., "--out", "-o", help="Output root directory"),
     workers: int = typer.Option(2, "--workers", "-w", help="Number of parallel workers"),
 ):
@@ -291,7 +468,7 @@ def process_video(
     Helper function to process a single video.
     Used by batch processor and CLI.
     """
-    return main(
+    return _run_pipeline(
         base=base,
         overlay_video=overlay_video,
         overlay_audio=overlay_audio,
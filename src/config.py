@@ -1,9 +1,19 @@
 """Configuration management for Keo Shortform Factory."""
 
-import yaml
+import os
+import copy
+import functools
 from pathlib import Path
 from typing import Dict, Any
 
+import yaml
+
+# Prefer the libyaml-backed C loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
 
 def get_default_config() -> Dict[str, Any]:
     """Get default configuration for the shortform factory."""
@@ -12,12 +22,15 @@ def get_default_config() -> Dict[str, Any]:
         "overlay": {
             "position": "top-right",
             "opacity": 0.9,
-            "margin_px": 24
+            "margin_px": 24,
+            "safe_area": False,
+            "hwaccel": "auto"
         },
         "slicing": {
             "clip_len": 20,
             "stride": 18,
             "min_conf": 0.15,
+            "max_lag_seconds": 5.0,
             "scene_detect": False,
             "hook_detect": False
         },
@@ -28,28 +41,40 @@ def get_default_config() -> Dict[str, Any]:
         },
         "export": {
             "ratio": "9:16",
+            "ratios": [],
+            "hwaccel": "auto",
+            "encode_full_ladder": False,
             "quality_ladder": [
-                {"codec": "libx264", "crf": 20, "preset": "veryfast"},
+                {"codec": "libx264", "crf": 20, "preset": "faster"},
                 {"codec": "prores_ks", "profile": 3}
             ]
         }
     }
 
 
+@functools.lru_cache(maxsize=64)
+def _load_config_cached(config_path: str, mtime: float) -> Dict[str, Any]:
+    """Parse a YAML config; mtime is part of the key so edits invalidate it."""
+    with open(config_path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
 def load_config(config_path: str) -> Dict[str, Any]:
     """Load configuration from YAML file."""
     try:
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+        config = _load_config_cached(str(config_path), os.path.getmtime(config_path))
     except Exception as e:
         raise ValueError(f"Failed to load config from {config_path}: {e}")
 
+    # Callers override keys in place, so never hand out the cached dict
+    return copy.deepcopy(config)
+
 
 def save_config(config: Dict[str, Any], config_path: str) -> None:
     """Save configuration to YAML file."""
     try:
         with open(config_path, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False, indent=2)
+            yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False, indent=2)
     except Exception as e:
         raise ValueError(f"Failed to save config to {config_path}: {e}")
 
@@ -1,11 +1,17 @@
 """Video cutting and slicing functionality for Keo Shortform Factory."""
 
 import os
-import subprocess
+import csv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 
-from .utils import run_ffmpeg_command, ensure_dir
+import numpy as np
+
+from .utils import run_ffmpeg_command, ensure_dir, get_video_info
+
+# Clip durations reported by the segment muxer, keyed by clip path
+_segment_durations: Dict[str, float] = {}
 
 
 def slice_video(
@@ -37,36 +43,19 @@ def slice_video(
     print(f"📋 Will generate {len(start_times)} clips")
 
     # Create clips
-    output_paths = []
-    for i, start_time in enumerate(start_times):
-        output_path = create_clip(
-            video_path,
-            output_dir,
-            start_time,
-            clip_len,
-            i
-        )
-        if output_path:
-            output_paths.append(output_path)
+    output_paths = create_clips(video_path, output_dir, start_times, clip_len)
 
     print(f"✅ Generated {len(output_paths)} clips")
     return output_paths
 
 
 def get_video_duration(video_path: str) -> float:
-    """Get video duration using ffprobe."""
-    cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-show_entries", "format=duration",
-        "-of", "csv=p=0",
-        video_path
-    ]
+    """Get video duration from the (cached) probe metadata."""
+    info = get_video_info(video_path)
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
-    except Exception as e:
+        return float(info["format"]["duration"])
+    except (TypeError, KeyError, ValueError) as e:
         print(f"❌ Error getting video duration: {e}")
         return 0.0
 
@@ -78,23 +67,154 @@ def generate_clip_starts(duration: float, clip_len: float, stride: float) -> Lis
         print(f"⚠️  Video duration ({duration:.2f}s) is shorter than clip length ({clip_len}s)")
         return []
 
-    # Generate start times
-    start_times = []
-    current_time = 0.0
+    # Regular windows that fit entirely inside the video
+    start_times = np.arange(0.0, duration - clip_len + 1e-9, stride)
+
+    # Add a final, partial window if at least half a clip remains after it
+    next_start = start_times[-1] + stride
+    if next_start < duration and duration - next_start >= clip_len * 0.5:
+        start_times = np.append(start_times, next_start)
+
+    return start_times.tolist()
+
+
+def clip_filename(start_time: float, end_time: float) -> str:
+    """Build the clip_<start>_<end>.mp4 filename for a clip window."""
+    return f"clip_{int(start_time):06d}_{int(end_time):06d}.mp4"
+
+
+def can_segment_clips(start_times: List[float], clip_len: float) -> bool:
+    """Whether the clip windows are ascending and non-overlapping."""
+    return bool(start_times) and all(
+        later - earlier >= clip_len
+        for earlier, later in zip(start_times, start_times[1:])
+    )
+
 
-    while current_time + clip_len <= duration:
-        start_times.append(current_time)
-        current_time += stride
+def segment_cut_points(start_times: List[float], clip_len: float) -> List[float]:
+    """Every clip start and end (ms-rounded, > 0) for the segment muxer to split at."""
+    cut_points = sorted({round(t, 3) for t in start_times} | {round(t + clip_len, 3) for t in start_times})
+    return [t for t in cut_points if t > 0]
 
-        # Ensure we don't go beyond video duration
-        if current_time + clip_len > duration and current_time < duration:
-            # Add a final clip from current position if there's enough remaining
-            remaining = duration - current_time
-            if remaining >= clip_len * 0.5:  # At least half the desired length
-                start_times.append(current_time)
-            break
 
-    return start_times
+def iter_clips(
+    video_path: str,
+    output_dir: str,
+    start_times: List[float],
+    clip_len: float
+) -> Iterator[str]:
+    """
+    Yield clip paths as soon as each clip has been cut.
+
+    Lets callers start exporting early clips while later ones are still
+    being cut.
+    """
+    if can_segment_clips(start_times, clip_len):
+        yield from create_clips_segmented(video_path, output_dir, start_times, clip_len)
+        return
+
+    for i, start_time in enumerate(start_times):
+        output_path = create_clip(video_path, output_dir, start_time, clip_len, i)
+        if output_path:
+            yield output_path
+
+
+def create_clips(
+    video_path: str,
+    output_dir: str,
+    start_times: List[float],
+    clip_len: float,
+    max_workers: int = 1
+) -> List[str]:
+    """
+    Create clips for every start time.
+
+    Non-overlapping, ascending windows are cut in a single segment-muxer
+    pass; overlapping windows (stride < clip_len, or starts moved by scene
+    or hook detection) can't be expressed as segments, so those fall back
+    to one ffmpeg call per clip, run max_workers at a time.
+    """
+    if can_segment_clips(start_times, clip_len):
+        return create_clips_segmented(video_path, output_dir, start_times, clip_len)
+
+    # Stream-copy cuts are I/O bound ffmpeg children, so threads are enough
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        output_paths = list(executor.map(
+            lambda args: create_clip(video_path, output_dir, args[1], clip_len, args[0]),
+            enumerate(start_times)
+        ))
+
+    return [path for path in output_paths if path]
+
+
+def create_clips_segmented(
+    video_path: str,
+    output_dir: str,
+    start_times: List[float],
+    clip_len: float
+) -> List[str]:
+    """
+    Cut ascending, non-overlapping clips with one ffmpeg segment-muxer pass.
+
+    The input is read once and split at every clip start and end; segments
+    that fall in the gaps between clips are deleted afterwards.
+    """
+    ensure_dir(output_dir)
+
+    # Split at every clip boundary; segment i then starts at segment_starts[i]
+    cut_points = segment_cut_points(start_times, clip_len)
+    segment_starts = [0.0] + cut_points
+
+    segment_pattern = Path(output_dir) / "seg_%06d.mp4"
+    segment_list = Path(output_dir) / "segments.csv"
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", video_path,
+        "-map", "0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_times", ",".join(f"{t:.3f}" for t in cut_points),
+        "-segment_time_delta", "0.05",
+        "-reset_timestamps", "1",
+        "-segment_list", str(segment_list),
+        "-segment_list_type", "csv",
+        str(segment_pattern)
+    ]
+
+    success = run_ffmpeg_command(cmd, f"Cutting {len(start_times)} clips in one pass")
+
+    # The muxer reports each segment's actual start/end, which saves an
+    # ffprobe per clip when validating durations later
+    reported = {}
+    if segment_list.exists():
+        with open(segment_list, 'r') as f:
+            for row in csv.reader(f):
+                if len(row) >= 3:
+                    reported[row[0]] = float(row[2]) - float(row[1])
+        segment_list.unlink()
+
+    wanted = {round(t, 3) for t in start_times}
+    output_paths = []
+
+    for segment_index, segment_start in enumerate(segment_starts):
+        segment_path = Path(output_dir) / f"seg_{segment_index:06d}.mp4"
+        if not segment_path.exists():
+            continue
+
+        if success and segment_start in wanted:
+            output_path = Path(output_dir) / clip_filename(segment_start, segment_start + clip_len)
+            segment_path.replace(output_path)
+            output_paths.append(str(output_path))
+            if segment_path.name in reported:
+                _segment_durations[str(output_path)] = reported[segment_path.name]
+        else:
+            segment_path.unlink()
+
+    if not success:
+        print(f"❌ Failed to cut clips from {video_path}")
+
+    return output_paths
 
 
 def create_clip(
@@ -108,22 +228,18 @@ def create_clip(
 
     ensure_dir(output_dir)
 
-    # Format start time for filename
-    start_str = f"{int(start_time):06d}"
     end_time = start_time + duration
-    end_str = f"{int(end_time):06d}"
-
-    # Create output filename
-    base_name = Path(video_path).stem
-    output_filename = f"clip_{start_str}_{end_str}.mp4"
-    output_path = Path(output_dir) / output_filename
+    output_path = Path(output_dir) / clip_filename(start_time, end_time)
+    _segment_durations.pop(str(output_path), None)
 
-    # FFmpeg command for cutting
+    # FFmpeg command for cutting; -ss before -i seeks in the demuxer instead
+    # of reading and discarding everything up to the start, and -t is
+    # relative to that seek point
     cmd = [
         "ffmpeg", "-y",
-        "-i", video_path,
         "-ss", str(start_time),
-        "-to", str(end_time),
+        "-i", video_path,
+        "-t", str(duration),
         "-c", "copy",  # Copy streams for speed
         "-avoid_negative_ts", "make_zero",
         str(output_path)
@@ -148,19 +264,22 @@ def validate_clip(
 ) -> bool:
     """Validate that a clip was created correctly."""
 
-    if not Path(clip_path).exists():
+    try:
+        file_size = os.stat(clip_path).st_size
+    except FileNotFoundError:
         print(f"❌ Clip file does not exist: {clip_path}")
         return False
 
-    # Check actual duration
-    actual_duration = get_video_duration(clip_path)
+    # Check actual duration, preferring the segment muxer's report
+    actual_duration = _segment_durations.get(str(clip_path))
+    if actual_duration is None:
+        actual_duration = get_video_duration(clip_path)
 
     if abs(actual_duration - expected_duration) > tolerance:
         print(f"❌ Clip duration mismatch: expected {expected_duration:.2f}s, got {actual_duration:.2f}s")
         return False
 
     # Check file size (should be > 0)
-    file_size = Path(clip_path).stat().st_size
     if file_size == 0:
         print(f"❌ Clip file is empty: {clip_path}")
         return False
@@ -171,22 +290,24 @@ def validate_clip(
 def cleanup_failed_clips(output_dir: str) -> None:
     """Clean up any incomplete or failed clip files."""
 
-    output_path = Path(output_dir)
-
-    if not output_path.exists():
+    try:
+        entries = os.scandir(output_dir)
+    except FileNotFoundError:
         return
 
-    # Look for incomplete/empty clip files
-    for clip_file in output_path.glob("clip_*.mp4"):
-        file_size = clip_file.stat().st_size
+    # Look for incomplete/empty clip files in a single directory pass
+    with entries:
+        for entry in entries:
+            if not (entry.name.startswith("clip_") and entry.name.endswith(".mp4")):
+                continue
 
-        # Remove very small files (likely failed)
-        if file_size < 1024:  # Less than 1KB
-            print(f"🗑️  Removing incomplete clip: {clip_file.name}")
-            try:
-                clip_file.unlink()
-            except Exception as e:
-                print(f"❌ Error removing {clip_file}: {e}")
+            # Remove very small files (likely failed)
+            if entry.stat().st_size < 1024:  # Less than 1KB
+                print(f"🗑️  Removing incomplete clip: {entry.name}")
+                try:
+                    os.unlink(entry.path)
+                except Exception as e:
+                    print(f"❌ Error removing {entry.path}: {e}")
 
 
 def get_clip_info(clip_path: str) -> Dict[str, Any]:
@@ -197,21 +318,10 @@ def get_clip_info(clip_path: str) -> Dict[str, Any]:
     if duration == 0:
         return {"error": "Could not determine clip duration"}
 
-    # Get more detailed info using ffprobe
-    cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-print_format", "json",
-        "-show_format",
-        "-show_streams",
-        clip_path
-    ]
+    # Reuses the cached probe from the duration lookup
+    data = get_video_info(clip_path)
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        import json
-        data = json.loads(result.stdout)
-
         # Extract basic info
         format_info = data.get("format", {})
         streams = data.get("streams", [])
@@ -232,4 +342,4 @@ def get_clip_info(clip_path: str) -> Dict[str, Any]:
         return {
             "duration": duration,
             "error": f"Could not get detailed info: {e}"
-        }
\ No newline at end of file
+        }
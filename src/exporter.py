@@ -1,18 +1,218 @@
 """Video export functionality for Keo Shortform Factory."""
 
+import os
+import math
+import functools
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
-from .utils import run_ffmpeg_command, ensure_dir
+from .utils import run_ffmpeg_command, ensure_dir, get_video_dimensions as probe_video_dimensions
+from .cutter import clip_filename, can_segment_clips, segment_cut_points
 
 
 def export_clips(
     clip_path: str,
     output_dir: str,
-    config: Dict[str, Any]
+    config: Dict[str, Any],
+    threads: Optional[int] = None,
+    scale_filter: Optional[str] = None
 ) -> str:
-    """Export a clip in the specified aspect ratio."""
+    """
+    Export a clip in the specified aspect ratio.
+
+    Pass a scale_filter from build_export_filter to reuse it across clips
+    cut from the same source instead of re-probing each one.
+    """
+
+    if len(get_export_targets(config)) > 1:
+        # Several ratios/qualities: decode once and encode each of them
+        exported = export_clip_ratios(clip_path, output_dir, config, threads=threads)
+        return exported[0] if exported else ""
+
+    target_ratio, width, height, quality_settings = get_export_settings(config)
+
+    # Create output path
+    ensure_dir(output_dir)
+    clip_name = Path(clip_path).stem
+    output_path = Path(output_dir) / f"{clip_name}_{target_ratio.replace(':', 'x')}.mp4"
+
+    if config.get("export", {}).get("stream_copy"):
+        # Source already has the target aspect ratio
+        success = copy_single_clip(clip_path, str(output_path))
+    else:
+        # Export with aspect ratio conversion
+        success = export_single_clip(
+            clip_path,
+            str(output_path),
+            width,
+            height,
+            quality_settings,
+            threads,
+            scale_filter=scale_filter,
+            hwaccel=config.get("export", {}).get("hwaccel", "auto")
+        )
+
+    if success:
+        return str(output_path)
+    else:
+        print(f"❌ Failed to export {clip_path}")
+        return ""
+
+
+def get_export_targets(config: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    (ratio, quality settings) pairs every clip is exported to.
+
+    The first pair is export.ratio with get_export_settings' quality, i.e.
+    the primary export. export.ratios adds more ratios, and with
+    export.encode_full_ladder every quality_ladder entry is encoded too,
+    not just the first.
+    """
+    export_config = config.get("export", {})
+    target_ratio, _, _, quality_settings = get_export_settings(config)
+
+    ratios = list(dict.fromkeys([target_ratio, *export_config.get("ratios", [])]))
+    qualities = [quality_settings]
+    if export_config.get("encode_full_ladder"):
+        qualities.extend(export_config.get("quality_ladder", [])[1:])
+
+    return [(ratio, quality) for ratio in ratios for quality in qualities]
+
+
+def _export_output_name(clip_name: str, ratio: str, quality_settings: Dict[str, Any], primary: bool) -> str:
+    """File name for one export target; the primary quality keeps the plain name."""
+    name = f"{clip_name}_{ratio.replace(':', 'x')}"
+    if primary:
+        return f"{name}.mp4"
+
+    codec = quality_settings.get("codec", "libx264")
+    extension = "mov" if codec.startswith("prores") else "mp4"
+    return f"{name}_{codec}.{extension}"
+
+
+def _seek_input_args(input_path: str, start_time: Optional[float]) -> List[str]:
+    """-i arguments for input_path, seeking accurately to start_time if given."""
+    if start_time is None:
+        return ["-i", input_path]
+
+    # Fast keyframe seek to just before the window, then an accurate
+    # decode-and-discard seek for the remainder
+    preroll = min(start_time, 2.0)
+    return ["-ss", f"{start_time - preroll:.3f}", "-i", input_path, "-ss", f"{preroll:.3f}"]
+
+
+def export_clip_ratios(
+    clip_path: str,
+    output_dir: str,
+    config: Dict[str, Any],
+    targets: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+    threads: Optional[int] = None,
+    start_time: Optional[float] = None,
+    duration: Optional[float] = None,
+    clip_name: Optional[str] = None
+) -> List[str]:
+    """
+    Export a clip to several ratios/qualities with a single FFmpeg call.
+
+    The clip is decoded once and split in the filter graph; each branch
+    is scaled/cropped to its ratio and encoded to its own output with its
+    quality settings.
+
+    Args:
+        clip_path: Clip (or master, with start_time/duration) to export
+        output_dir: Directory for the exported files
+        config: Configuration dictionary (ratios, quality ladder, hwaccel)
+        targets: (ratio, quality settings) pairs; defaults to
+            get_export_targets(config)
+        threads: Optional cap on ffmpeg threads
+        start_time: Start of the window to export, if not the whole input
+        duration: Length of the window to export
+        clip_name: Output name stem; defaults to the input's stem
+
+    Returns:
+        Exported paths in the same order as targets (the primary export
+        first), or an empty list if the export failed
+    """
+    if targets is None:
+        targets = get_export_targets(config)
+    if not targets:
+        return []
+
+    hwaccel = config.get("export", {}).get("hwaccel", "auto")
+    primary_quality = targets[0][1]
+
+    ensure_dir(output_dir)
+    clip_name = clip_name or Path(clip_path).stem
+
+    branches = "".join(f"[s{index}]" for index in range(len(targets)))
+    filters = [f"[0:v]split={len(targets)}{branches}"]
+    outputs = []
+    output_paths = []
+    input_args = []
+
+    for index, (ratio, quality_settings) in enumerate(targets):
+        try:
+            width, height = map(int, ratio.split(":"))
+        except ValueError:
+            print(f"❌ Invalid ratio format: {ratio}, using 9:16")
+            ratio, width, height = "9:16", 9, 16
+
+        target_input_args, encoder_args = build_encoder_args(quality_settings, hwaccel)
+        # CUDA decoding downloads frames to system memory, so it serves
+        # every branch whichever encoder asked for it
+        input_args = input_args or target_input_args
+
+        output_name = _export_output_name(clip_name, ratio, quality_settings, quality_settings is primary_quality)
+        output_path = str(Path(output_dir) / output_name)
+        filters.append(f"[s{index}]{build_fill_scale_filter(width, height)}[v{index}]")
+        # -t is an output option, so every output needs its own
+        duration_args = ["-t", f"{duration:.3f}"] if duration is not None else []
+        outputs.extend([
+            "-map", f"[v{index}]",
+            "-map", "0:a?",
+            *duration_args,
+            *encoder_args,
+            "-c:a", "aac",
+            output_path
+        ])
+        output_paths.append(output_path)
+
+    cmd = ["ffmpeg", "-y", *input_args, *_seek_input_args(clip_path, start_time)]
+    cmd.extend(["-filter_complex", ";".join(filters)])
+
+    if threads:
+        cmd.extend(["-threads", str(threads)])
+
+    cmd.extend(outputs)
+
+    target_names = ", ".join(dict.fromkeys(ratio for ratio, _ in targets))
+    if run_ffmpeg_command(cmd, f"Exporting {clip_name} to {target_names}"):
+        return output_paths
+
+    print(f"❌ Failed to export {clip_path}")
+    return []
+
+
+def ratio_matches(width: int, height: int, ratio: str) -> bool:
+    """Whether a width x height frame already has the given W:H aspect ratio."""
+    try:
+        ratio_width, ratio_height = map(int, ratio.split(":"))
+    except ValueError:
+        return False
+
+    if min(width, height, ratio_width, ratio_height) <= 0:
+        return False
+
+    # Compare reduced fractions so 1080x1920 matches 9:16 exactly
+    divisor = math.gcd(width, height)
+    ratio_divisor = math.gcd(ratio_width, ratio_height)
+    return (width // divisor, height // divisor) == (ratio_width // ratio_divisor, ratio_height // ratio_divisor)
+
+
+def get_export_settings(config: Dict[str, Any]) -> Tuple[str, int, int, Dict[str, Any]]:
+    """Resolve the target ratio, its width/height and quality settings from config."""
 
     # Get export configuration
     export_config = config.get("export", {})
@@ -27,33 +227,215 @@ def export_clips(
 
     # Get quality settings
     quality_ladder = export_config.get("quality_ladder", [
-        {"codec": "libx264", "crf": 20, "preset": "veryfast"}
+        {"codec": "libx264", "crf": 20, "preset": "faster"}
     ])
 
     # Use first quality setting for now (could be extended for multiple qualities)
     quality_settings = quality_ladder[0] if quality_ladder else {
-        "codec": "libx264", "crf": 20, "preset": "veryfast"
+        "codec": "libx264", "crf": 20, "preset": "faster"
     }
 
-    # Create output path
+    # A speed profile overrides the ladder's preset/CRF for x264 exports
+    speed_profile = export_config.get("speed_profile")
+    if speed_profile and quality_settings.get("codec", "libx264") == "libx264":
+        if speed_profile in SPEED_PROFILES:
+            quality_settings = {**quality_settings, **SPEED_PROFILES[speed_profile]}
+        else:
+            print(f"⚠️  Unknown speed profile: {speed_profile}, using quality ladder settings")
+
+    return target_ratio, width, height, quality_settings
+
+
+def build_export_filter(input_path: str, config: Dict[str, Any]) -> str:
+    """Build the scale/crop filter that converts input_path to the configured ratio."""
+    _, width, height, _ = get_export_settings(config)
+    input_width, input_height = get_video_dimensions(input_path)
+    return build_scale_filter(input_width, input_height, width, height)
+
+
+def slice_and_export(
+    master_path: str,
+    start_times: List[float],
+    clip_len: float,
+    output_dir: str,
+    config: Dict[str, Any],
+    max_workers: int = 1,
+    threads: Optional[int] = None
+) -> List[str]:
+    """
+    Cut clips from the master straight into the target aspect ratio.
+
+    Each clip is seeked, re-framed and encoded by a single ffmpeg call, so
+    no stream-copied intermediate clip is written to disk and read back.
+    When the windows tile most of the master, one ffmpeg process encodes
+    and splits all of them instead. Output names match what export_clips
+    produces from cut clips.
+
+    Returns:
+        Exported clip paths in start-time order ("" for failed clips)
+    """
+    target_ratio, width, height, quality_settings = get_export_settings(config)
+    targets = get_export_targets(config)
+    multi_target = len(targets) > 1
+    stream_copy = config.get("export", {}).get("stream_copy", False) and not multi_target
+    hwaccel = config.get("export", {}).get("hwaccel", "auto")
+    scale_filter = None if stream_copy or multi_target else build_export_filter(master_path, config)
     ensure_dir(output_dir)
-    clip_name = Path(clip_path).stem
-    output_path = Path(output_dir) / f"{clip_name}_{target_ratio.replace(':', 'x')}.mp4"
 
-    # Export with aspect ratio conversion
-    success = export_single_clip(
-        clip_path,
-        str(output_path),
-        width,
-        height,
-        quality_settings
+    if multi_target:
+        # Each window is decoded once and encoded to every target
+        def export_window_targets(start_time: float) -> str:
+            exported = export_clip_ratios(
+                master_path, output_dir, config, targets, threads,
+                start_time=start_time,
+                duration=clip_len,
+                clip_name=Path(clip_filename(start_time, start_time + clip_len)).stem
+            )
+            return exported[0] if exported else ""
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            return list(executor.map(export_window_targets, start_times))
+
+    if not stream_copy and _covers_most_of_master(start_times, clip_len):
+        return _slice_and_export_segmented(
+            master_path, start_times, clip_len, output_dir,
+            target_ratio, scale_filter, quality_settings, threads, hwaccel
+        )
+
+    def export_window(start_time: float) -> str:
+        clip_name = Path(clip_filename(start_time, start_time + clip_len)).stem
+        output_path = Path(output_dir) / f"{clip_name}_{target_ratio.replace(':', 'x')}.mp4"
+
+        if stream_copy:
+            success = copy_single_clip(master_path, str(output_path), start_time, clip_len)
+        else:
+            success = export_single_clip(
+                master_path,
+                str(output_path),
+                width,
+                height,
+                quality_settings,
+                threads,
+                start_time=start_time,
+                duration=clip_len,
+                scale_filter=scale_filter,
+                hwaccel=hwaccel
+            )
+
+        if success:
+            return str(output_path)
+        print(f"❌ Failed to export clip at {start_time:.2f}s")
+        return ""
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return list(executor.map(export_window, start_times))
+
+
+def _covers_most_of_master(start_times: List[float], clip_len: float) -> bool:
+    """
+    Whether the windows can be encoded as one segmented pass cheaply.
+
+    They must be ascending and non-overlapping, and leave little uncut
+    footage, since a single pass also has to encode the gaps between clips.
+    """
+    if not can_segment_clips(start_times, clip_len):
+        return False
+    encoded_span = start_times[-1] + clip_len
+    return len(start_times) * clip_len >= 0.9 * encoded_span
+
+
+def _slice_and_export_segmented(
+    master_path: str,
+    start_times: List[float],
+    clip_len: float,
+    output_dir: str,
+    target_ratio: str,
+    scale_filter: str,
+    quality_settings: Dict[str, Any],
+    threads: Optional[int] = None,
+    hwaccel: str = "cpu"
+) -> List[str]:
+    """
+    Encode the master once and split it into clips with the segment muxer.
+
+    Keyframes are forced at every clip boundary so the splits land exactly
+    on them. One ffmpeg process handles every clip instead of one per clip.
+    """
+    cut_points = segment_cut_points(start_times, clip_len)
+    segment_starts = [0.0] + cut_points
+    times = ",".join(f"{t:.3f}" for t in cut_points)
+    segment_pattern = Path(output_dir) / "exp_%06d.mp4"
+
+    input_args, encoder_args = build_encoder_args(quality_settings, hwaccel)
+
+    cmd = [
+        "ffmpeg", "-y",
+        *input_args,
+        "-i", master_path,
+        "-t", f"{start_times[-1] + clip_len:.3f}",
+        "-vf", scale_filter,
+        *encoder_args,
+        "-c:a", "aac",
+        "-force_key_frames", times,
+    ]
+
+    if threads:
+        cmd.extend(["-threads", str(threads)])
+
+    cmd.extend([
+        "-f", "segment",
+        "-segment_times", times,
+        "-segment_time_delta", "0.05",
+        "-reset_timestamps", "1",
+        str(segment_pattern)
+    ])
+
+    success = run_ffmpeg_command(
+        cmd, f"Exporting {len(start_times)} clips from {Path(master_path).name} in one pass"
     )
 
-    if success:
-        return str(output_path)
-    else:
-        print(f"❌ Failed to export {clip_path}")
-        return ""
+    # Rename the segments that are clips; drop the gaps between them
+    wanted = {round(t, 3) for t in start_times}
+    exported = {}
+    for segment_index, segment_start in enumerate(segment_starts):
+        segment_path = Path(output_dir) / f"exp_{segment_index:06d}.mp4"
+        if not segment_path.exists():
+            continue
+
+        if success and segment_start in wanted:
+            clip_name = Path(clip_filename(segment_start, segment_start + clip_len)).stem
+            output_path = Path(output_dir) / f"{clip_name}_{target_ratio.replace(':', 'x')}.mp4"
+            segment_path.replace(output_path)
+            exported[segment_start] = str(output_path)
+        else:
+            segment_path.unlink()
+
+    if not success:
+        print(f"❌ Failed to export clips from {master_path}")
+
+    return [exported.get(round(t, 3), "") for t in start_times]
+
+
+def copy_single_clip(
+    input_path: str,
+    output_path: str,
+    start_time: Optional[float] = None,
+    duration: Optional[float] = None
+) -> bool:
+    """Export a clip without re-encoding, for sources already in the target ratio."""
+    cmd = ["ffmpeg", "-y"]
+
+    if start_time is not None:
+        cmd.extend(["-ss", f"{start_time:.3f}"])
+
+    cmd.extend(["-i", input_path])
+
+    if duration is not None:
+        cmd.extend(["-t", f"{duration:.3f}"])
+
+    cmd.extend(["-c", "copy", "-avoid_negative_ts", "make_zero", output_path])
+
+    return run_ffmpeg_command(cmd, f"Copying {Path(input_path).name} (already in target ratio)")
 
 
 def export_single_clip(
@@ -61,35 +443,45 @@ def export_single_clip(
     output_path: str,
     target_width: int,
     target_height: int,
-    quality_settings: Dict[str, Any]
+    quality_settings: Dict[str, Any],
+    threads: Optional[int] = None,
+    start_time: Optional[float] = None,
+    duration: Optional[float] = None,
+    scale_filter: Optional[str] = None,
+    hwaccel: str = "cpu"
 ) -> bool:
-    """Export a single clip with aspect ratio conversion."""
+    """
+    Export a single clip with aspect ratio conversion.
 
-    # Get input video dimensions
-    input_width, input_height = get_video_dimensions(input_path)
+    threads caps ffmpeg's encoder threads, so several exports running side
+    by side don't each spawn one thread per core. With start_time/duration
+    only that window of the input is exported. Without a scale_filter the
+    input is scaled to cover the target and center-cropped. hwaccel
+    selects the encoder as in build_encoder_args.
+    """
 
-    # Calculate scaling and cropping for target aspect ratio
-    scale_filter = build_scale_filter(
-        input_width, input_height,
-        target_width, target_height
-    )
+    if scale_filter is None:
+        # Scale and crop for the target aspect ratio, sized by ffmpeg itself
+        scale_filter = build_fill_scale_filter(target_width, target_height)
+
+    input_args, encoder_args = build_encoder_args(quality_settings, hwaccel)
 
     # Build FFmpeg command
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", input_path,
+    cmd = ["ffmpeg", "-y", *input_args]
+
+    cmd.extend(_seek_input_args(input_path, start_time))
+
+    if duration is not None:
+        cmd.extend(["-t", f"{duration:.3f}"])
+
+    cmd.extend([
         "-vf", scale_filter,
-        "-c:v", quality_settings.get("codec", "libx264"),
+        *encoder_args,
         "-c:a", "aac",
-        "-preset", quality_settings.get("preset", "veryfast"),
-        "-crf", str(quality_settings.get("crf", 20)),
-    ]
+    ])
 
-    # Add codec-specific options
-    if quality_settings.get("codec") == "prores_ks":
-        cmd.extend([
-            "-profile:v", str(quality_settings.get("profile", 3))
-        ])
+    if threads:
+        cmd.extend(["-threads", str(threads)])
 
     cmd.append(output_path)
 
@@ -99,25 +491,125 @@ def export_single_clip(
     )
 
 
-def get_video_dimensions(video_path: str) -> tuple:
-    """Get video dimensions using ffprobe."""
-    cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=s=x:p=0",
-        video_path
-    ]
+# export.speed_profile presets for x264. "faster" is the knee of x264's
+# speed/quality curve; ultrafast is kept for throwaway previews only since
+# it inflates file sizes considerably at the same CRF
+SPEED_PROFILES = {
+    "archive": {"preset": "slow", "crf": 18},
+    "balanced": {"preset": "faster", "crf": 20},
+    "fast": {"preset": "veryfast", "crf": 23},
+    "preview": {"preset": "ultrafast", "crf": 28},
+}
+
+# Clips encoded per ffmpeg process by export_multiple_clips; bounds how many
+# decoder/encoder instances a single process holds at once
+EXPORT_BATCH_SIZE = 8
+
+# x264 presets mapped onto the closest NVENC p1 (fastest) .. p7 (slowest)
+NVENC_PRESETS = {
+    "ultrafast": "p1",
+    "superfast": "p1",
+    "veryfast": "p2",
+    "faster": "p3",
+    "fast": "p4",
+    "medium": "p5",
+    "slow": "p6",
+    "slower": "p7",
+    "veryslow": "p7",
+}
+
+
+@functools.lru_cache(maxsize=1)
+def nvenc_available() -> bool:
+    """Whether this ffmpeg can actually open h264_nvenc (checked once per process)."""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+    if "h264_nvenc" not in result.stdout:
+        return False
+
+    # Builds list NVENC even without a usable GPU, so try a one-frame encode
+    probe = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "color=black:s=256x256:d=0.04",
+            "-frames:v", "1", "-c:v", "h264_nvenc", "-f", "null", "-"
+        ],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return probe.returncode == 0
+
 
+@functools.lru_cache(maxsize=1)
+def gpu_count() -> int:
+    """Number of NVIDIA GPUs reported by nvidia-smi (1 if it can't be queried)."""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        width, height = map(int, result.stdout.strip().split('x'))
-        return width, height
-    except Exception as e:
-        print(f"❌ Error getting video dimensions: {e}")
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=count", "--format=csv,noheader"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True
+        )
+        return max(1, int(result.stdout.splitlines()[0]))
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError, IndexError):
+        return 1
+
+
+def build_encoder_args(
+    quality_settings: Dict[str, Any],
+    hwaccel: str = "cpu"
+) -> Tuple[List[str], List[str]]:
+    """
+    Build the (input, output) FFmpeg arguments for the video encoder.
+
+    hwaccel is "cpu", "nvenc" or "auto". H.264 exports use NVENC with CUDA
+    decoding when requested (or, for "auto", when it works on this host);
+    otherwise the configured CPU codec is used.
+
+    Returns:
+        Args to place before -i, and encoder args to place after it
+    """
+    codec = quality_settings.get("codec", "libx264")
+    preset = quality_settings.get("preset", "faster")
+    crf = int(quality_settings.get("crf", 20))
+
+    use_nvenc = codec == "libx264" and hwaccel in ("auto", "nvenc") and nvenc_available()
+    if hwaccel == "nvenc" and not use_nvenc:
+        print("⚠️  NVENC requested but not available, encoding on the CPU")
+
+    if use_nvenc:
+        # Frames are decoded on the GPU and downloaded for the CPU
+        # crop/scale/subtitle filters before going back to NVENC
+        return ["-hwaccel", "cuda"], [
+            "-c:v", "h264_nvenc",
+            "-preset", NVENC_PRESETS.get(preset, "p4"),
+            "-tune", "hq",
+            "-rc", "vbr",
+            "-cq", str(crf + 1),
+            "-b:v", "0",
+        ]
+
+    encoder_args = ["-c:v", codec, "-preset", preset, "-crf", str(crf)]
+
+    # Add codec-specific options
+    if codec == "prores_ks":
+        encoder_args = ["-c:v", codec, "-profile:v", str(quality_settings.get("profile", 3))]
+
+    return [], encoder_args
+
+
+def get_video_dimensions(video_path: str) -> tuple:
+    """Get video dimensions from the (cached) probe metadata."""
+    dimensions = probe_video_dimensions(video_path)
+    if dimensions is None:
+        print(f"❌ Error getting video dimensions for {video_path}")
         return 1920, 1080  # Fallback
 
+    return dimensions
+
 
 def build_scale_filter(
     input_width: int,
@@ -151,33 +643,161 @@ def build_scale_filter(
     return f"scale={target_width}:{target_height}:force_original_aspect_ratio=decrease,pad={target_width}:{target_height}:-1:-1:black"
 
 
+def build_fill_scale_filter(target_width: int, target_height: int) -> str:
+    """
+    Build a scale/crop filter that needs no knowledge of the input size.
+
+    Scales the input until it covers the target on both axes, then crops
+    the overflow from the center; equivalent to build_scale_filter but
+    resolved by libavfilter at runtime, so no probe is needed.
+    """
+    return (
+        f"scale={target_width}:{target_height}:force_original_aspect_ratio=increase,"
+        f"crop={target_width}:{target_height}"
+    )
+
+
 def export_multiple_clips(
     clip_paths: List[str],
     output_dir: str,
     config: Dict[str, Any]
 ) -> List[str]:
-    """Export multiple clips with aspect ratio conversion."""
+    """
+    Export multiple clips with aspect ratio conversion.
+
+    Clips are encoded EXPORT_BATCH_SIZE at a time by one ffmpeg process with
+    an output per clip, so process and codec start-up is paid once per batch
+    rather than once per clip. A batch that fails is retried clip by clip.
+    With several export targets each clip is instead decoded once and
+    encoded to all of them (export_clip_ratios).
+    """
+    if len(get_export_targets(config)) > 1:
+        with ThreadPoolExecutor(max_workers=get_export_workers(config, len(clip_paths))) as executor:
+            exported = executor.map(lambda clip_path: export_clips(clip_path, output_dir, config), clip_paths)
+            return [path for path in exported if path]
+
+    if config.get("export", {}).get("stream_copy"):
+        exported = (export_clips(clip_path, output_dir, config) for clip_path in clip_paths)
+        return [path for path in exported if path]
+
+    target_ratio, width, height, quality_settings = get_export_settings(config)
+    hwaccel = config.get("export", {}).get("hwaccel", "auto")
+    ensure_dir(output_dir)
+
+    def export_batch(batch: List[str]) -> List[str]:
+        output_paths = [
+            str(Path(output_dir) / f"{Path(clip_path).stem}_{target_ratio.replace(':', 'x')}.mp4")
+            for clip_path in batch
+        ]
+
+        if export_clip_batch(batch, output_paths, width, height, quality_settings, hwaccel):
+            return output_paths
+
+        print(f"⚠️  Batched export failed, exporting {len(batch)} clips individually")
+        exported = (export_clips(clip_path, output_dir, config) for clip_path in batch)
+        return [path for path in exported if path]
+
+    batches = [
+        clip_paths[batch_start:batch_start + EXPORT_BATCH_SIZE]
+        for batch_start in range(0, len(clip_paths), EXPORT_BATCH_SIZE)
+    ]
+
+    # Batches are independent ffmpeg processes, so run several side by side
+    with ThreadPoolExecutor(max_workers=get_export_workers(config, len(batches))) as executor:
+        return [path for paths in executor.map(export_batch, batches) for path in paths]
+
+
+def get_export_workers(config: Dict[str, Any], num_jobs: int) -> int:
+    """
+    Number of exports to run in parallel for num_jobs independent jobs.
+
+    Uses export.parallel_workers (default: half the cores). NVENC exports
+    are also capped at two sessions per GPU to stay under the driver's
+    concurrent session limit.
+    """
+    export_config = config.get("export", {})
+    workers = export_config.get("parallel_workers") or max(1, (os.cpu_count() or 2) // 2)
+
+    _, _, _, quality_settings = get_export_settings(config)
+    if (
+        quality_settings.get("codec", "libx264") == "libx264"
+        and export_config.get("hwaccel", "auto") in ("auto", "nvenc")
+        and nvenc_available()
+    ):
+        workers = min(workers, 2 * gpu_count())
 
-    exported_paths = []
+    return max(1, min(workers, num_jobs))
 
-    for clip_path in clip_paths:
-        exported_path = export_clips(clip_path, output_dir, config)
-        if exported_path:
-            exported_paths.append(exported_path)
 
-    return exported_paths
+def export_clip_batch(
+    input_paths: List[str],
+    output_paths: List[str],
+    target_width: int,
+    target_height: int,
+    quality_settings: Dict[str, Any],
+    hwaccel: str = "cpu"
+) -> bool:
+    """
+    Export several clips with aspect ratio conversion in one FFmpeg call.
+
+    Each input gets its own crop/scale chain in a shared filter graph and
+    is written to the matching output path.
+    """
+    input_args, encoder_args = build_encoder_args(quality_settings, hwaccel)
+
+    cmd = ["ffmpeg", "-y"]
+    filters = []
+    scale_filter = build_fill_scale_filter(target_width, target_height)
+
+    for index, input_path in enumerate(input_paths):
+        cmd.extend([*input_args, "-i", input_path])
+
+        filters.append(f"[{index}:v]{scale_filter}[v{index}]")
+
+    cmd.extend(["-filter_complex", ";".join(filters)])
+
+    for index, output_path in enumerate(output_paths):
+        cmd.extend([
+            "-map", f"[v{index}]",
+            "-map", f"{index}:a?",
+            *encoder_args,
+            "-c:a", "aac",
+            output_path
+        ])
+
+    return run_ffmpeg_command(
+        cmd,
+        f"Exporting {len(input_paths)} clips to {target_width}:{target_height}"
+    )
 
 
 def validate_export(
     exported_path: str,
-    target_ratio: str
+    target_ratio: str,
+    deep: bool = False
 ) -> bool:
-    """Validate that an exported video meets requirements."""
+    """
+    Validate that an exported video meets requirements.
 
-    if not Path(exported_path).exists():
+    By default only a stat() of the file is needed; deep also reads the
+    container metadata and checks the dimensions against target_ratio.
+    """
+
+    try:
+        file_size = os.stat(exported_path).st_size
+    except FileNotFoundError:
         print(f"❌ Exported file does not exist: {exported_path}")
         return False
 
+    # Check file size (should be reasonable)
+    if file_size < 1024:  # Less than 1KB
+        print(f"❌ Exported file is too small: {file_size} bytes")
+        return False
+
+    if not deep:
+        print(f"✅ Export validation passed: {file_size / 1024:.1f}KB")
+        return True
+
     # Check target aspect ratio
     width, height = get_video_dimensions(exported_path)
     expected_width, expected_height = map(int, target_ratio.split(":"))
@@ -189,12 +809,6 @@ def validate_export(
         print(f"❌ Exported video dimensions {width}x{height} don't match target {expected_width}x{expected_height}")
         return False
 
-    # Check file size (should be reasonable)
-    file_size = Path(exported_path).stat().st_size
-    if file_size < 1024:  # Less than 1KB
-        print(f"❌ Exported file is too small: {file_size} bytes")
-        return False
-
     print(f"✅ Export validation passed: {width}x{height}, {file_size / 1024:.1f}KB")
     return True
 
@@ -205,7 +819,12 @@ def create_export_preview(
     config: Dict[str, Any],
     duration: float = 5.0
 ) -> bool:
-    """Create a short preview of the export for validation."""
+    """
+    Create a short preview of the export for validation.
+
+    A clip already within 1% of the target ratio is previewed by stream
+    copying its first seconds; only clips that need reframing are encoded.
+    """
 
     # Get export configuration
     export_config = config.get("export", {})
@@ -216,16 +835,26 @@ def create_export_preview(
     except ValueError:
         width, height = 9, 16
 
+    clip_width, clip_height = get_video_dimensions(clip_path)
+    if abs(clip_width / clip_height - width / height) <= 0.01 * (width / height):
+        return copy_single_clip(clip_path, output_path, duration=duration)
+
+    # Smaller previews come from the preset; ultrafast output is much
+    # larger at the same CRF
+    input_args, encoder_args = build_encoder_args(
+        {"preset": "veryfast", "crf": 23},
+        export_config.get("hwaccel", "auto")
+    )
+
     # Create short preview
     cmd = [
         "ffmpeg", "-y",
+        *input_args,
         "-i", clip_path,
         "-t", str(duration),
         "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease",
-        "-c:v", "libx264",
+        *encoder_args,
         "-c:a", "aac",
-        "-preset", "ultrafast",
-        "-crf", "25",
         output_path
     ]
 
@@ -234,9 +863,10 @@ def create_export_preview(
 
 def batch_export_validation(
     exported_paths: List[str],
-    target_ratio: str
+    target_ratio: str,
+    deep: bool = False
 ) -> Dict[str, Any]:
-    """Validate multiple exported clips and return summary."""
+    """Validate multiple exported clips and return summary; deep is passed to validate_export."""
 
     results = {
         "total": len(exported_paths),
@@ -245,8 +875,19 @@ def batch_export_validation(
         "errors": []
     }
 
-    for path in exported_paths:
-        if validate_export(path, target_ratio):
+    if not exported_paths:
+        return results
+
+    if deep:
+        # Each deep validation probes its file, so overlap them
+        workers = min(len(exported_paths), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            validity = list(executor.map(lambda path: validate_export(path, target_ratio, deep=True), exported_paths))
+    else:
+        validity = [validate_export(path, target_ratio) for path in exported_paths]
+
+    for path, is_valid in zip(exported_paths, validity):
+        if is_valid:
             results["valid"] += 1
         else:
             results["invalid"] += 1
@@ -1,10 +1,179 @@
 """Hook finder functionality for identifying engaging segments (V1 Enhancement)."""
 
+import os
 import subprocess
 import librosa
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Sequence
+
+from numba import njit
+
+from .utils import decode_audio_samples
+
+# Upper bound on decoded audio kept in memory between hook-finder calls
+AUDIO_CACHE_MAX_MB = int(os.environ.get("KEO_AUDIO_CACHE_MB", "2048"))
+
+# Decoded mono float32 audio keyed by (path, mtime_ns, sample_rate), least
+# recently used first
+_audio_cache: "OrderedDict[Tuple[str, int, int], Tuple[np.ndarray, int]]" = OrderedDict()
+
+
+def _load_audio(audio_path: str, sr: int = 48000) -> Tuple[np.ndarray, int]:
+    """
+    Decode audio_path to mono float32 samples, reusing earlier decodes.
+
+    Decoding goes through decode_audio_samples (PyAV or an FFmpeg pipe), so
+    video containers such as the composited master work as well as WAVs.
+    Entries are invalidated when the file's mtime changes and evicted
+    least-recently-used first once the cache exceeds AUDIO_CACHE_MAX_MB.
+    The returned array is shared with the cache and marked read-only.
+    """
+    key = (str(audio_path), os.stat(audio_path).st_mtime_ns, sr)
+
+    cached = _audio_cache.get(key)
+    if cached is not None:
+        _audio_cache.move_to_end(key)
+        return cached
+
+    y = decode_audio_samples(audio_path, sr)
+    if y is None or len(y) == 0:
+        raise RuntimeError(f"Could not decode audio from {audio_path}")
+
+    y.setflags(write=False)
+    _audio_cache[key] = (y, sr)
+
+    max_bytes = AUDIO_CACHE_MAX_MB * 1024 * 1024
+    while len(_audio_cache) > 1 and sum(entry[0].nbytes for entry in _audio_cache.values()) > max_bytes:
+        _audio_cache.popitem(last=False)
+
+    return y, sr
+
+
+def _cuda_device() -> Optional[Any]:
+    """Return a CUDA torch device if torch is installed and a GPU is usable."""
+    try:
+        import torch
+    except ImportError:
+        return None
+
+    return torch.device("cuda") if torch.cuda.is_available() else None
+
+
+def _frame_features_torch(
+    y: np.ndarray,
+    sr: int,
+    frame_length: int,
+    hop_length: int,
+    features: Sequence[str],
+    device: Any
+) -> Dict[str, np.ndarray]:
+    """
+    GPU version of librosa's rms / zero_crossing_rate / spectral_centroid.
+
+    Uses the same centered framing and padding as librosa, so results match
+    it to float32 precision.
+    """
+    import torch
+
+    # torch.tensor copies, so read-only cached arrays are fine here
+    wave = torch.tensor(y, dtype=torch.float32, device=device)
+    pad = frame_length // 2
+    result = {}
+
+    if "rms" in features:
+        frames = torch.nn.functional.pad(wave[None, None], (pad, pad))[0, 0].unfold(0, frame_length, hop_length)
+        result["rms"] = frames.pow(2).mean(dim=-1).sqrt()
+
+    if "zcr" in features:
+        # librosa edge-pads for ZCR and treats near-zero samples as positive
+        edge = torch.nn.functional.pad(wave[None, None], (pad, pad), mode="replicate")[0, 0]
+        frames = edge.unfold(0, frame_length, hop_length)
+        signs = torch.signbit(torch.where(frames.abs() <= 1e-10, torch.zeros_like(frames), frames))
+        crossings = (signs[:, 1:] != signs[:, :-1]).sum(dim=-1)
+        result["zcr"] = crossings.float() / frame_length
+
+    if "centroid" in features:
+        spectrum = torch.stft(
+            wave,
+            n_fft=frame_length,
+            hop_length=hop_length,
+            window=torch.hann_window(frame_length, device=device),
+            center=True,
+            pad_mode="constant",
+            return_complex=True
+        ).abs()
+        freqs = torch.fft.rfftfreq(frame_length, d=1.0 / sr).to(device)
+        total = spectrum.sum(dim=0)
+        centroid = (freqs[:, None] * spectrum).sum(dim=0) / torch.where(total > 0, total, torch.ones_like(total))
+        result["centroid"] = centroid
+
+    return {name: values.cpu().numpy() for name, values in result.items()}
+
+
+def compute_frame_features(
+    y: np.ndarray,
+    sr: int,
+    frame_length: int = 2048,
+    hop_length: int = 512,
+    features: Sequence[str] = ("rms", "zcr", "centroid")
+) -> Dict[str, np.ndarray]:
+    """
+    Compute per-frame RMS, zero-crossing rate and spectral centroid.
+
+    Runs as batched tensor ops on the GPU when torch with CUDA is available,
+    otherwise falls back to librosa on the CPU.
+
+    Args:
+        y: Mono audio samples
+        sr: Sample rate
+        frame_length: Analysis frame (and FFT) size
+        hop_length: Hop between frames
+        features: Subset of "rms", "zcr" and "centroid" to compute
+
+    Returns:
+        Dictionary of 1-D feature arrays keyed by feature name
+    """
+    device = _cuda_device()
+    if device is not None and len(y) > 0:
+        try:
+            return _frame_features_torch(y, sr, frame_length, hop_length, features, device)
+        except Exception as e:
+            print(f"⚠️  GPU feature extraction failed, using CPU: {e}")
+
+    result = {}
+    if "rms" in features:
+        result["rms"] = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
+    if "zcr" in features:
+        result["zcr"] = librosa.feature.zero_crossing_rate(y, frame_length=frame_length, hop_length=hop_length)[0]
+    if "centroid" in features:
+        result["centroid"] = librosa.feature.spectral_centroid(
+            y=y, sr=sr, n_fft=frame_length, hop_length=hop_length
+        )[0]
+
+    return result
+
+
+def _energy_from_array(y: np.ndarray, sr: int, hop_length: int = 512) -> np.ndarray:
+    """Min-max normalized RMS envelope of already-decoded samples."""
+    rms = compute_frame_features(y, sr, hop_length=hop_length, features=("rms",))["rms"]
+    rms = rms.astype(np.float32, copy=False)
+
+    # Normalize in place rather than allocating a temporary per operation
+    lo, hi = float(rms.min()), float(rms.max())
+    np.subtract(rms, lo, out=rms)
+    np.multiply(rms, 1.0 / (hi - lo + 1e-10), out=rms)
+
+    return rms
+
+
+def _rescale_inplace(x: np.ndarray, lo: float, hi: float, scale: float = 1.0) -> np.ndarray:
+    """Map [lo, hi] onto [0, scale] in place, clipping values outside the range."""
+    np.subtract(x, lo, out=x)
+    np.multiply(x, scale / (hi - lo), out=x)
+    np.clip(x, 0, scale, out=x)
+    return x
 
 
 def extract_audio_energy(
@@ -19,15 +188,9 @@ def extract_audio_energy(
         Tuple of (energy_envelope, duration_seconds)
     """
     try:
-        y, sr = librosa.load(audio_path, sr=sr, mono=True)
-
-        rms = librosa.feature.rms(y=y, hop_length=hop_length)[0]
+        y, sr = _load_audio(audio_path, sr)
 
-        rms_normalized = (rms - np.min(rms)) / (np.max(rms) - np.min(rms) + 1e-10)
-
-        duration = len(y) / sr
-
-        return rms_normalized, duration
+        return _energy_from_array(y, sr, hop_length), len(y) / sr
 
     except Exception as e:
         print(f"❌ Error extracting audio energy: {e}")
@@ -48,34 +211,37 @@ def detect_voice_activity(
         List of (start_time, end_time) tuples for voice segments
     """
     try:
-        y, sr = librosa.load(audio_path, sr=sr, mono=True)
-
-        zcr = librosa.feature.zero_crossing_rate(y, frame_length=frame_length, hop_length=hop_length)[0]
-        rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-
-        zcr_norm = (zcr - np.min(zcr)) / (np.max(zcr) - np.min(zcr) + 1e-10)
-        rms_norm = (rms - np.min(rms)) / (np.max(rms) - np.min(rms) + 1e-10)
-
-        voice_prob = (0.3 * zcr_norm + 0.7 * rms_norm)
-
-        is_voice = voice_prob > threshold
-
-        times = librosa.frames_to_time(np.arange(len(is_voice)), sr=sr, hop_length=hop_length)
-
-        voice_segments = []
-        in_segment = False
-        segment_start = 0
-
-        for i, (active, time) in enumerate(zip(is_voice, times)):
-            if active and not in_segment:
-                segment_start = time
-                in_segment = True
-            elif not active and in_segment:
-                voice_segments.append((segment_start, time))
-                in_segment = False
+        y, sr = _load_audio(audio_path, sr)
 
-        if in_segment:
-            voice_segments.append((segment_start, times[-1]))
+        frame_features = compute_frame_features(
+            y, sr, frame_length=frame_length, hop_length=hop_length, features=("zcr", "rms")
+        )
+        zcr = frame_features["zcr"].astype(np.float32, copy=False)
+        rms = frame_features["rms"].astype(np.float32, copy=False)
+
+        # Percentile bounds keep a single DC offset or clipped spike from
+        # squashing the rest of the range; a flat signal divides 0/0 to NaN,
+        # which never compares above the threshold. Both features are
+        # pre-weighted in place and summed into the rms buffer, giving
+        # 0.3 * zcr_norm + 0.7 * rms_norm without temporaries
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zcr_lo, zcr_hi = np.percentile(zcr, [1, 99])
+            rms_lo, rms_hi = np.percentile(rms, [1, 99])
+            _rescale_inplace(zcr, zcr_lo, zcr_hi, 0.3)
+            voice_prob = np.add(_rescale_inplace(rms, rms_lo, rms_hi, 0.7), zcr, out=rms)
+
+            is_voice = voice_prob > threshold
+
+        # +1 where a voiced run starts, -1 one frame past where it ends
+        edges = np.diff(np.r_[0, is_voice.astype(np.int8), 0])
+        starts = np.flatnonzero(edges == 1)
+        ends = np.minimum(np.flatnonzero(edges == -1), len(is_voice) - 1)
+
+        # Only the run boundaries are converted from frames to seconds
+        voice_segments = list(zip(
+            (starts * hop_length / sr).tolist(),
+            (ends * hop_length / sr).tolist()
+        ))
 
         return voice_segments
 
@@ -112,7 +278,8 @@ def find_energy_peaks(
         distance=distance
     )
 
-    peak_times = librosa.frames_to_time(peaks, sr=sr, hop_length=hop_length)
+    # Frame index to seconds, as librosa.frames_to_time computes it
+    peak_times = peaks * hop_length / sr
 
     return peak_times.tolist()
 
@@ -131,19 +298,49 @@ def score_hook_potential(
         Dictionary with hook score and breakdown
     """
     try:
-        y, sr = librosa.load(audio_path, sr=48000, mono=True, offset=start_time, duration=window_size)
+        y, sr = _load_audio(audio_path, 48000)
+    except Exception as e:
+        print(f"⚠️  Error scoring hook potential: {e}")
+        return {"hook_score": 0, "breakdown": {}, "recommendation": "unknown"}
+
+    return _score_hook_potential_array(y, sr, int(start_time * sr), int(window_size * sr))
+
+
+def _score_hook_potential_array(
+    y: np.ndarray,
+    sr: int,
+    start_sample: int,
+    num_samples: int
+) -> Dict[str, Any]:
+    """
+    Score the hook potential of a window of already-decoded audio.
+
+    Args:
+        y: Mono audio samples for the whole track
+        sr: Sample rate
+        start_sample: First sample of the window
+        num_samples: Window length in samples
+
+    Returns:
+        Dictionary with hook score and breakdown
+    """
+    try:
+        start_sample = max(0, int(start_sample))
+        y = y[start_sample:start_sample + int(num_samples)]
 
         if len(y) == 0:
             return {"hook_score": 0, "breakdown": {}}
 
-        rms = librosa.feature.rms(y=y)[0]
+        frame_features = compute_frame_features(y, sr)
+
+        rms = frame_features["rms"]
         energy_mean = np.mean(rms)
         energy_std = np.std(rms)
 
-        zcr = librosa.feature.zero_crossing_rate(y)[0]
+        zcr = frame_features["zcr"]
         zcr_mean = np.mean(zcr)
 
-        spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
+        spectral_centroid = frame_features["centroid"]
         brightness = np.mean(spectral_centroid) / sr
 
         energy_score = np.clip(energy_mean * 10, 0, 1)
@@ -174,6 +371,64 @@ def score_hook_potential(
         return {"hook_score": 0, "breakdown": {}, "recommendation": "unknown"}
 
 
+@njit(cache=True)
+def _pick_hooks(ts: np.ndarray, scores: np.ndarray, min_gap: float, n: int) -> np.ndarray:
+    """Indices of the best-scoring candidates, skipping any within min_gap of one already picked."""
+    order = np.argsort(-scores, kind="mergesort")
+    chosen = np.empty(min(n, len(ts)), dtype=np.int64)
+    count = 0
+
+    for idx in order:
+        if count >= n:
+            break
+
+        too_close = False
+        for j in range(count):
+            if abs(ts[idx] - ts[chosen[j]]) < min_gap:
+                too_close = True
+                break
+
+        if not too_close:
+            chosen[count] = idx
+            count += 1
+
+    return chosen[:count]
+
+
+@njit(cache=True)
+def _fill_gaps(grid: np.ndarray, selected_ts: np.ndarray, limit: float) -> np.ndarray:
+    """
+    Greedily add grid times furthest from every time selected so far.
+
+    Stops once limit times are selected or no grid point is left at a
+    positive distance; returns only the newly added times.
+    """
+    taken = np.empty(len(selected_ts) + len(grid), dtype=np.float64)
+    taken[:len(selected_ts)] = selected_ts
+    count = len(selected_ts)
+    added = 0
+
+    while count < limit:
+        best_time = 0.0
+        best_gap = 0.0
+        for t in grid:
+            min_distance = np.inf
+            for j in range(count):
+                min_distance = min(min_distance, abs(t - taken[j]))
+            if min_distance > best_gap:
+                best_gap = min_distance
+                best_time = t
+
+        if best_gap <= 0.0 or best_time == 0.0:
+            break
+
+        taken[count] = best_time
+        count += 1
+        added += 1
+
+    return taken[count - added:count]
+
+
 def find_hooks(
     audio_path: str,
     video_duration: float,
@@ -194,7 +449,14 @@ def find_hooks(
     """
     print(f"🎯 Finding {num_hooks} engaging hooks in audio...")
 
-    energy_envelope, duration = extract_audio_energy(audio_path)
+    # Decode once; every candidate below is scored on a slice of this array
+    try:
+        y, sr = _load_audio(audio_path, 48000)
+        energy_envelope, duration = _energy_from_array(y, sr), len(y) / sr
+    except Exception as e:
+        print(f"❌ Error extracting audio energy: {e}")
+        y, sr = np.array([]), 48000
+        energy_envelope, duration = np.array([]), 0.0
 
     if len(energy_envelope) == 0:
         print("⚠️  Could not extract energy, falling back to uniform distribution")
@@ -214,48 +476,28 @@ def find_hooks(
     candidate_times = []
     for peak_time in peak_times:
         if clip_len / 2 < peak_time < duration - clip_len / 2:
-            hook_analysis = score_hook_potential(audio_path, peak_time - clip_len / 4, clip_len / 2)
+            hook_analysis = _score_hook_potential_array(
+                y, sr, int((peak_time - clip_len / 4) * sr), int(clip_len / 2 * sr)
+            )
             candidate_times.append({
                 "timestamp": peak_time,
                 **hook_analysis
             })
 
-    candidate_times.sort(key=lambda x: x["hook_score"], reverse=True)
-
-    selected_hooks = []
-    for candidate in candidate_times:
-        if len(selected_hooks) >= num_hooks:
-            break
-
-        too_close = False
-        for existing in selected_hooks:
-            if abs(candidate["timestamp"] - existing["timestamp"]) < clip_len * 0.5:
-                too_close = True
-                break
-
-        if not too_close:
-            selected_hooks.append(candidate)
-
-    while len(selected_hooks) < num_hooks and len(selected_hooks) < duration / clip_len:
-        candidates_set = set(h["timestamp"] for h in selected_hooks)
-
-        best_time = None
-        best_gap = 0
-        for t in np.linspace(clip_len, duration - clip_len, int(duration / clip_len)):
-            if t not in candidates_set:
-                min_distance = min((abs(t - h["timestamp"]) for h in selected_hooks), default=float('inf'))
-                if min_distance > best_gap:
-                    best_gap = min_distance
-                    best_time = t
-
-        if best_time:
-            hook_analysis = score_hook_potential(audio_path, best_time, clip_len / 2)
-            selected_hooks.append({
-                "timestamp": best_time,
-                **hook_analysis
-            })
-        else:
-            break
+    # Candidate selection runs JIT-compiled over plain timestamp/score arrays
+    cand_ts = np.array([c["timestamp"] for c in candidate_times], dtype=np.float64)
+    cand_scores = np.array([c["hook_score"] for c in candidate_times], dtype=np.float64)
+    selected_hooks = [candidate_times[i] for i in _pick_hooks(cand_ts, cand_scores, clip_len * 0.5, num_hooks)]
+
+    # Top up with evenly spread times that sit furthest from the chosen hooks
+    grid = np.linspace(clip_len, duration - clip_len, int(duration / clip_len))
+    selected_ts = np.array([h["timestamp"] for h in selected_hooks], dtype=np.float64)
+    for fill_time in _fill_gaps(grid, selected_ts, min(float(num_hooks), duration / clip_len)):
+        hook_analysis = _score_hook_potential_array(y, sr, int(fill_time * sr), int(clip_len / 2 * sr))
+        selected_hooks.append({
+            "timestamp": float(fill_time),
+            **hook_analysis
+        })
 
     selected_hooks.sort(key=lambda x: x["timestamp"])
 
@@ -283,16 +525,17 @@ def bias_starts_to_hooks(
     if not hooks:
         return window_starts
 
-    hook_times = [h["timestamp"] for h in hooks]
-    adjusted_starts = []
+    hook_times = np.sort(np.asarray([h["timestamp"] for h in hooks], dtype=np.float64))
+    starts = np.asarray(window_starts, dtype=np.float64)
 
-    for start in window_starts:
-        nearby_hooks = [h for h in hook_times if abs(h - start) < attraction_radius]
+    # Nearest hook on either side of each start (earlier one on ties)
+    idx = np.searchsorted(hook_times, starts)
+    left = hook_times[np.clip(idx - 1, 0, len(hook_times) - 1)]
+    right = hook_times[np.clip(idx, 0, len(hook_times) - 1)]
+    left_distance = np.abs(starts - left)
+    right_distance = np.abs(right - starts)
 
-        if nearby_hooks:
-            nearest_hook = min(nearby_hooks, key=lambda h: abs(h - start))
-            adjusted_starts.append(nearest_hook)
-        else:
-            adjusted_starts.append(start)
+    nearest = np.where(left_distance <= right_distance, left, right)
+    within = np.minimum(left_distance, right_distance) < attraction_radius
 
-    return adjusted_starts
+    return np.where(within, nearest, starts).tolist()
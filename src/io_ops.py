@@ -7,11 +7,12 @@ from pathlib import Path
 from typing import Dict, Any, Tuple, Optional
 
 from .utils import (
-    run_ffprobe_command,
+    run_cached_ffprobe_command,
     validate_file_exists,
     get_video_info,
     get_audio_info,
     extract_audio_from_video,
+    extract_and_normalize,
     ensure_dir
 )
 
@@ -32,6 +33,17 @@ def validate_inputs(base_path: str, overlay_video_path: str, overlay_audio_path:
     }
 
 
+def _parse_rational(value: str) -> float:
+    """Parse an ffprobe rational such as "30000/1001" (or a plain number) to a float."""
+    try:
+        numerator, _, denominator = str(value).partition("/")
+        if not denominator:
+            return float(numerator)
+        return float(numerator) / float(denominator) if float(denominator) else 0.0
+    except ValueError:
+        return 0.0
+
+
 def probe_media(file_path: str) -> Dict[str, Any]:
     """Probe media file for detailed information."""
     if not validate_file_exists(file_path):
@@ -50,7 +62,7 @@ def probe_media(file_path: str) -> Dict[str, Any]:
             audio_stream = next(s for s in info["streams"] if s.get("codec_type") == "audio")
 
             duration = float(info.get("format", {}).get("duration", 0))
-            fps = eval(video_stream.get("r_frame_rate", "0/1"))
+            fps = _parse_rational(video_stream.get("r_frame_rate", "0/1"))
 
             return {
                 "type": "video",
@@ -84,7 +96,7 @@ def probe_media(file_path: str) -> Dict[str, Any]:
         file_path
     ]
 
-    basic_info = run_ffprobe_command(cmd)
+    basic_info = run_cached_ffprobe_command(cmd, file_path)
     if basic_info:
         duration = float(basic_info.get("format", {}).get("duration", 0))
         return {
@@ -117,7 +129,7 @@ def prepare_overlay_audio(overlay_audio_path: str, output_dir: str, target_lufs:
     overlay_name = Path(overlay_audio_path).stem
     normalized_path = Path(output_dir) / f"{overlay_name}_normalized.wav"
 
-    success = normalize_audio_loudness(overlay_audio_path, str(normalized_path), target_lufs)
+    success = extract_and_normalize(overlay_audio_path, str(normalized_path), target_lufs)
     if not success:
         raise RuntimeError(f"Failed to normalize audio {overlay_audio_path}")
 
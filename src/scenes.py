@@ -1,9 +1,20 @@
 """Scene detection functionality for Keo Shortform Factory (V1 Enhancement)."""
 
+import re
 import subprocess
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 import numpy as np
+from numba import njit
+
+from .utils import FFMPEG_QUIET_FLAGS, cuda_decode_available
+
+# Timestamp field of the frame lines written by ffmpeg's metadata=print filter
+_PTS_TIME_PATTERN = re.compile(rb"pts_time:(\d+(?:\.\d+)?)")
+
+# Timestamp and picture type of one ffprobe compact frame line; ffprobe
+# always writes best_effort_timestamp_time before pict_type
+_FRAME_TYPE_PATTERN = re.compile(rb"best_effort_timestamp_time=(\d+(?:\.\d+)?)\|(?:[^|\n]*\|)*?pict_type=([IPB])")
 
 
 def detect_scenes(
@@ -24,31 +35,28 @@ def detect_scenes(
     """
     print(f"🎬 Detecting scenes in {Path(video_path).name}...")
 
+    # libavfilter scores each frame's difference from the previous one
+    # (0-1); select keeps only the frames over the threshold and
+    # metadata=print writes their timestamps to stdout
+    hwaccel_args = ["-hwaccel", "cuda"] if cuda_decode_available() else []
+
     cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-show_entries", "packet=pts_time,flags",
-        "-select_streams", "v:0",
-        "-of", "csv=p=0",
-        video_path
+        "ffmpeg",
+        *FFMPEG_QUIET_FLAGS,
+        *hwaccel_args,
+        "-i", video_path,
+        "-map", "0:v:0",
+        "-vf", f"select='gt(scene,{threshold / 100.0})',metadata=print:file=-",
+        "-an",
+        "-f", "null",
+        "-"
     ]
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-
-        scene_times = []
-        lines = result.stdout.strip().split('\n')
-
-        for line in lines:
-            parts = line.split(',')
-            if len(parts) >= 2:
-                time_str, flags = parts[0], parts[1]
-                try:
-                    timestamp = float(time_str)
-                    if 'K' in flags:
-                        scene_times.append(timestamp)
-                except (ValueError, IndexError):
-                    continue
+        # Matched as bytes; only the captured numbers are ever decoded
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+
+        scene_times = [float(match) for match in _PTS_TIME_PATTERN.findall(result.stdout)]
 
         filtered_scenes = filter_scenes_by_min_length(scene_times, min_scene_len)
         print(f"📊 Found {len(filtered_scenes)} scene changes")
@@ -58,6 +66,24 @@ def detect_scenes(
     except subprocess.CalledProcessError as e:
         print(f"❌ Scene detection failed: {e}")
         return []
+    except FileNotFoundError:
+        print("❌ FFmpeg not found. Please install FFmpeg and ensure it's in your PATH.")
+        return []
+
+
+@njit(cache=True)
+def _min_length_mask(scene_times: np.ndarray, min_length: float) -> np.ndarray:
+    """Greedy keep-mask: a scene survives if it starts min_length after the last kept one."""
+    keep = np.zeros(len(scene_times), dtype=np.bool_)
+    keep[0] = True
+    last_kept = scene_times[0]
+
+    for i in range(1, len(scene_times)):
+        if scene_times[i] - last_kept >= min_length:
+            keep[i] = True
+            last_kept = scene_times[i]
+
+    return keep
 
 
 def filter_scenes_by_min_length(
@@ -68,46 +94,31 @@ def filter_scenes_by_min_length(
     if not scene_times:
         return []
 
-    filtered = [scene_times[0]]
+    times = np.asarray(scene_times, dtype=np.float64)
 
-    for i in range(1, len(scene_times)):
-        if scene_times[i] - filtered[-1] >= min_length:
-            filtered.append(scene_times[i])
+    # Every gap already long enough means nothing needs the sequential scan
+    if np.all(np.diff(times) >= min_length):
+        return times.tolist()
 
-    return filtered
+    return times[_min_length_mask(times, float(min_length))].tolist()
 
 
-def merge_scenes_with_windows(
-    scene_times: List[float],
-    window_starts: List[float],
-    clip_len: float,
-    max_clips: int = None
-) -> List[float]:
+@njit(cache=True)
+def _snap_windows_to_scenes(scene_times: np.ndarray, window_starts: np.ndarray, clip_len: float) -> np.ndarray:
     """
-    Merge scene detection times with fixed window starts.
-    Prioritize scene boundaries for more natural cuts.
+    Two-pointer scan snapping each window start to its nearest scene.
 
-    Args:
-        scene_times: Scene change timestamps
-        window_starts: Fixed window start times
-        clip_len: Clip length in seconds
-        max_clips: Maximum number of clips to generate
-
-    Returns:
-        Merged list of optimal start times
+    Scenes within half a clip of a window are consumed by it, so a later
+    window can't snap to them again; a window snaps when its nearest
+    scene (earlier one on ties) is closer than 30% of a clip.
     """
-    if not scene_times:
-        return window_starts[:max_clips] if max_clips else window_starts
-
-    merged = []
+    merged = window_starts.copy()
     scene_idx = 0
-    window_idx = 0
 
-    while window_idx < len(window_starts) and (max_clips is None or len(merged) < max_clips):
+    for window_idx in range(len(window_starts)):
         window_start = window_starts[window_idx]
-
-        nearby_scene = None
-        best_distance = float('inf')
+        nearby_scene = 0.0
+        best_distance = np.inf
 
         while scene_idx < len(scene_times):
             scene_time = scene_times[scene_idx]
@@ -126,16 +137,46 @@ def merge_scenes_with_windows(
 
             scene_idx += 1
 
-        if nearby_scene is not None and best_distance < clip_len * 0.3:
-            merged.append(nearby_scene)
-        else:
-            merged.append(window_start)
-
-        window_idx += 1
+        if best_distance < clip_len * 0.3:
+            merged[window_idx] = nearby_scene
 
     return merged
 
 
+def merge_scenes_with_windows(
+    scene_times: List[float],
+    window_starts: List[float],
+    clip_len: float,
+    max_clips: int = None
+) -> List[float]:
+    """
+    Merge scene detection times with fixed window starts.
+    Prioritize scene boundaries for more natural cuts.
+
+    Args:
+        scene_times: Scene change timestamps
+        window_starts: Fixed window start times
+        clip_len: Clip length in seconds
+        max_clips: Maximum number of clips to generate
+
+    Returns:
+        Merged list of optimal start times
+    """
+    if not scene_times:
+        return window_starts[:max_clips] if max_clips else window_starts
+
+    windows = np.asarray(window_starts, dtype=np.float64)
+    if max_clips is not None:
+        windows = windows[:max_clips]
+
+    if len(windows) == 0:
+        return []
+
+    scenes = np.asarray(scene_times, dtype=np.float64)
+
+    return _snap_windows_to_scenes(scenes, windows, float(clip_len)).tolist()
+
+
 def get_scene_info(
     video_path: str,
     scene_times: List[float]
@@ -168,39 +209,76 @@ def analyze_scene_complexity(
 
     Returns complexity metrics that can help identify engaging segments.
     """
+    return analyze_scene_complexity_batch(video_path, [(start_time, start_time + duration)])[0]
+
+
+def analyze_scene_complexity_batch(
+    video_path: str,
+    spans: List[Tuple[float, float]]
+) -> List[Dict[str, Any]]:
+    """
+    Analyze the complexity of several spans of a video with a single ffprobe.
+
+    All spans go into one -read_intervals list; the frames ffprobe reports
+    are then bucketed into each [start, end) span by timestamp.
+
+    Args:
+        video_path: Path to video file
+        spans: (start_time, end_time) pairs in seconds
+
+    Returns:
+        Complexity metrics for each span, in the same order as spans
+    """
+    if not spans:
+        return []
+
     cmd = [
         "ffprobe",
         "-v", "quiet",
         "-select_streams", "v:0",
-        "-show_entries", "frame=pict_type,pkt_pts_time",
-        "-read_intervals", f"{start_time}%{start_time + duration}",
-        "-of", "csv=p=0",
+        "-show_entries", "frame=pict_type,best_effort_timestamp_time",
+        "-read_intervals", ",".join(f"{start}%{end}" for start, end in spans),
+        "-of", "compact=p=0",
         video_path
     ]
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        lines = result.stdout.strip().split('\n')
-
-        frame_types = {'I': 0, 'P': 0, 'B': 0}
-        for line in lines:
-            parts = line.split(',')
-            if len(parts) >= 1:
-                frame_type = parts[0]
-                if frame_type in frame_types:
-                    frame_types[frame_type] += 1
-
-        total_frames = sum(frame_types.values())
-
-        motion_score = (frame_types['P'] + frame_types['B']) / total_frames if total_frames > 0 else 0
-
-        return {
-            "motion_score": motion_score,
-            "frame_count": total_frames,
-            "i_frames": frame_types['I'],
-            "complexity": "high" if motion_score > 0.7 else "medium" if motion_score > 0.4 else "low"
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+
+        # One regex pass over the raw bytes; frames without a timestamp
+        # (N/A) or of another picture type simply don't match
+        matches = _FRAME_TYPE_PATTERN.findall(result.stdout)
+        frame_times = [float(timestamp) for timestamp, _ in matches]
+        frame_kinds = [kind.decode("ascii") for _, kind in matches]
+
+        # Sorted timestamps plus running per-type counts turn every span's
+        # tally into two searchsorted lookups
+        order = np.argsort(frame_times, kind="stable")
+        times = np.asarray(frame_times, dtype=np.float64)[order]
+        kinds = np.asarray(frame_kinds)[order]
+        cumulative = {
+            kind: np.concatenate([[0], np.cumsum(kinds == kind)])
+            for kind in ("I", "P", "B")
         }
 
+        results = []
+        for start, end in spans:
+            lo, hi = np.searchsorted(times, [start, end])
+            frame_types = {kind: int(counts[hi] - counts[lo]) for kind, counts in cumulative.items()}
+
+            total_frames = sum(frame_types.values())
+
+            motion_score = (frame_types['P'] + frame_types['B']) / total_frames if total_frames > 0 else 0
+
+            results.append({
+                "motion_score": motion_score,
+                "frame_count": total_frames,
+                "i_frames": frame_types['I'],
+                "complexity": "high" if motion_score > 0.7 else "medium" if motion_score > 0.4 else "low"
+            })
+
+        return results
+
     except Exception as e:
         print(f"⚠️  Could not analyze scene complexity: {e}")
-        return {"motion_score": 0, "complexity": "unknown"}
+        return [{"motion_score": 0, "complexity": "unknown"} for _ in spans]
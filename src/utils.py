@@ -1,53 +1,214 @@
 """Utility functions for Keo Shortform Factory."""
 
 import os
-import subprocess
+import sys
+import copy
 import json
+import logging
+import functools
+import subprocess
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Dict, Any, Tuple, Optional
 
+import numpy as np
+
+
+# Diagnostics from the shared helpers below. Messages keep the console
+# look of print, but worker processes in a batch hand their records to one
+# listener in the parent (see start_log_listener) instead of interleaving
+# writes on a shared stdout.
+logger = logging.getLogger("keo")
+
+if not logger.handlers:
+    _console_handler = logging.StreamHandler(sys.stdout)
+    _console_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_console_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def start_log_listener(mp_context: Any) -> Tuple[Any, QueueListener]:
+    """
+    Start forwarding worker log records to this process's console handlers.
+
+    Args:
+        mp_context: Multiprocessing context the workers will be started with
+
+    Returns:
+        (queue, listener); pass the queue to install_queue_logging in each
+        worker and stop the listener once the workers are done
+    """
+    queue = mp_context.Queue()
+    listener = QueueListener(queue, *logger.handlers, respect_handler_level=True)
+    listener.start()
+    return queue, listener
+
+
+def install_queue_logging(queue: Any) -> None:
+    """Worker initializer: send log records to the parent's listener queue."""
+    logger.handlers[:] = [QueueHandler(queue)]
+
+
+# Keep ffmpeg's stderr down to real errors so the parent isn't copying
+# megabytes of banner and progress output through a pipe on every call
+FFMPEG_QUIET_FLAGS = ["-hide_banner", "-loglevel", "error", "-nostats"]
+
+
+# Lines of ffmpeg stderr kept for the error report when a command fails
+FFMPEG_STDERR_TAIL_LINES = 200
+
+
+# Niceness for spawned ffmpeg processes (0 leaves them at normal priority)
+_ffmpeg_nice = 0
+
+
+def set_ffmpeg_priority(nice: int) -> None:
+    """Run subsequently spawned ffmpeg processes at the given niceness."""
+    global _ffmpeg_nice
+    _ffmpeg_nice = max(0, nice)
+
+
+def _lower_priority(pid: int) -> None:
+    """Renice a freshly spawned process so encodes don't starve the desktop."""
+    if _ffmpeg_nice <= 0 or not hasattr(os, "setpriority"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, pid, _ffmpeg_nice)
+    except OSError:
+        pass
+
 
 def run_ffmpeg_command(cmd: list, description: str = "Running FFmpeg") -> bool:
     """Run an FFmpeg command and return success status."""
+    if cmd and cmd[0] == "ffmpeg":
+        cmd = [cmd[0]] + FFMPEG_QUIET_FLAGS + cmd[1:]
+
+    # preexec_fn isn't safe with the worker threads that spawn ffmpeg, so
+    # POSIX processes are reniced right after launch instead
+    creationflags = 0
+    if os.name == "nt" and _ffmpeg_nice > 0:
+        creationflags = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+
     try:
-        print(f"🎬 {description}...")
-        result = subprocess.run(
+        logger.info(f"🎬 {description}...")
+        with subprocess.Popen(
             cmd,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            creationflags=creationflags
+        ) as process:
+            _lower_priority(process.pid)
+
+            # stdout is discarded, so draining stderr here can't deadlock;
+            # only the tail is kept however much a long encode writes
+            stderr_tail = deque(process.stderr, maxlen=FFMPEG_STDERR_TAIL_LINES)
+            process.wait()
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr="".join(stderr_tail))
         return True
     except subprocess.CalledProcessError as e:
-        print(f"❌ FFmpeg command failed: {e}")
-        print(f"Error output: {e.stderr}")
+        logger.error(f"❌ FFmpeg command failed: {e}")
+        logger.error(f"Error output: {e.stderr}")
         return False
     except FileNotFoundError:
-        print("❌ FFmpeg not found. Please install FFmpeg and ensure it's in your PATH.")
+        logger.error("❌ FFmpeg not found. Please install FFmpeg and ensure it's in your PATH.")
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def cuda_decode_available() -> bool:
+    """Whether this ffmpeg can decode with -hwaccel cuda (checked once per process)."""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-hwaccels"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+    if "cuda" not in result.stdout.split():
         return False
 
+    # Builds list the hwaccel without a usable GPU, so open a CUDA device
+    probe = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-init_hw_device", "cuda",
+            "-f", "lavfi", "-i", "color=black:s=64x64:d=0.04",
+            "-frames:v", "1", "-f", "null", "-"
+        ],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return probe.returncode == 0
+
+
+def _loads_json(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when it is installed."""
+    try:
+        import orjson
+    except ImportError:
+        return json.loads(data)
+
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    return orjson.loads(data)
+
 
 def run_ffprobe_command(cmd: list) -> Optional[Dict[str, Any]]:
     """Run an ffprobe command and return JSON output."""
     try:
+        # Keep stdout as bytes; the JSON parser decodes it directly
         result = subprocess.run(
             cmd,
             check=True,
-            capture_output=True,
-            text=True
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
         )
-        return json.loads(result.stdout)
+        return _loads_json(result.stdout)
     except subprocess.CalledProcessError as e:
-        print(f"❌ ffprobe command failed: {e}")
+        logger.error(f"❌ ffprobe command failed: {e}")
         return None
     except FileNotFoundError:
-        print("❌ ffprobe not found. Please install FFmpeg and ensure it's in your PATH.")
+        logger.error("❌ ffprobe not found. Please install FFmpeg and ensure it's in your PATH.")
         return None
     except json.JSONDecodeError:
-        print("❌ Failed to parse ffprobe output as JSON")
+        logger.error("❌ Failed to parse ffprobe output as JSON")
         return None
 
 
+@functools.lru_cache(maxsize=1024)
+def _run_ffprobe_cached(cmd: Tuple[str, ...], mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+    """Memoized ffprobe call; mtime and size are part of the key so rewrites invalidate it."""
+    return run_ffprobe_command(list(cmd))
+
+
+def run_cached_ffprobe_command(cmd: list, file_path: str) -> Optional[Dict[str, Any]]:
+    """Run an ffprobe command, reusing the result while file_path is unchanged."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return run_ffprobe_command(cmd)
+
+    # Hand out a copy so callers can't mutate the cached entry
+    return copy.deepcopy(_run_ffprobe_cached(tuple(cmd), stat.st_mtime_ns, stat.st_size))
+
+
+def write_json(data: Any, output_path: str) -> None:
+    """Write data as indented JSON, using orjson when it is installed."""
+    try:
+        import orjson
+    except ImportError:
+        with open(output_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        return
+
+    with open(output_path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+
+
 def ensure_dir(dir_path: str) -> Path:
     """Ensure directory exists and return Path object."""
     path = Path(dir_path)
@@ -94,29 +255,66 @@ def calculate_overlay_position(
             x, y = map(int, position.split(","))
             return x, y
         except ValueError:
-            print(f"⚠️  Invalid position '{position}', using top-right")
+            logger.warning(f"⚠️  Invalid position '{position}', using top-right")
             return base_width - overlay_width - margin, margin
 
 
+# Overlay x/y expressions per named position. W/H are the main video's
+# size and w/h the overlay's, resolved by the overlay filter itself; M is
+# replaced with the margin in pixels.
+POSITION_EXPR = {
+    "top-left": ("M", "M"),
+    "top-right": ("W-w-M", "M"),
+    "bottom-left": ("M", "H-h-M"),
+    "bottom-right": ("W-w-M", "H-h-M"),
+    "center": ("(W-w)/2", "(H-h)/2"),
+}
+
+
+def overlay_position_expression(position: str, margin: int = 24) -> Tuple[str, str]:
+    """
+    FFmpeg overlay x/y expressions for a position string.
+
+    Same placements as calculate_overlay_position, but left for the overlay
+    filter to evaluate (see POSITION_EXPR) so neither input has to be
+    probed first.
+    """
+    if position not in POSITION_EXPR:
+        # Try to parse as "x,y"
+        try:
+            x, y = map(int, position.split(","))
+            return str(x), str(y)
+        except ValueError:
+            logger.warning(f"⚠️  Invalid position '{position}', using top-right")
+            position = "top-right"
+
+    x_expr, y_expr = POSITION_EXPR[position]
+    return x_expr.replace("M", str(margin)), y_expr.replace("M", str(margin))
+
+
 def validate_file_exists(file_path: str, file_type: str = "file") -> bool:
     """Validate that a file exists and is readable."""
     path = Path(file_path)
     if not path.exists():
-        print(f"❌ {file_type.title()} file not found: {file_path}")
+        logger.error(f"❌ {file_type.title()} file not found: {file_path}")
         return False
 
     if not path.is_file():
-        print(f"❌ {file_path} is not a file")
+        logger.error(f"❌ {file_path} is not a file")
         return False
 
     return True
 
 
 def get_video_info(file_path: str) -> Optional[Dict[str, Any]]:
-    """Get basic video information using ffprobe."""
+    """Get basic video information, in-process via PyAV when available, else ffprobe."""
     if not validate_file_exists(file_path, "video"):
         return None
 
+    info = probe_container(file_path)
+    if info is not None:
+        return info
+
     cmd = [
         "ffprobe",
         "-v", "quiet",
@@ -126,14 +324,111 @@ def get_video_info(file_path: str) -> Optional[Dict[str, Any]]:
         file_path
     ]
 
-    return run_ffprobe_command(cmd)
+    return run_cached_ffprobe_command(cmd, file_path)
+
+
+@functools.lru_cache(maxsize=1024)
+def _probe_container_cached(file_path: str, mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+    """Memoized PyAV probe; mtime and size are part of the key so rewrites invalidate it."""
+    try:
+        import av
+    except ImportError:
+        return None
+
+    try:
+        with av.open(file_path) as container:
+            streams = []
+            for stream in container.streams:
+                codec_context = stream.codec_context
+                entry = {
+                    "codec_type": stream.type,
+                    "codec_name": codec_context.name if codec_context else "unknown",
+                }
+                if stream.type == "video":
+                    entry["width"] = codec_context.width
+                    entry["height"] = codec_context.height
+                    frame_rate = stream.guessed_rate or stream.average_rate
+                    if frame_rate:
+                        entry["r_frame_rate"] = f"{frame_rate.numerator}/{frame_rate.denominator}"
+                elif stream.type == "audio":
+                    entry["sample_rate"] = str(codec_context.sample_rate)
+                    layout = getattr(codec_context, "layout", None)
+                    entry["channels"] = layout.nb_channels if layout is not None else codec_context.channels
+                streams.append(entry)
+
+            if container.duration is None:
+                return None
+
+            return {
+                "format": {
+                    "duration": str(container.duration / av.time_base),
+                    "size": str(size),
+                    "bit_rate": str(container.bit_rate or 0),
+                },
+                "streams": streams,
+            }
+    except Exception:
+        return None
+
+
+def probe_container(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read container metadata in-process with PyAV (libavformat bindings).
+
+    Returns a subset of ffprobe's JSON layout ("format" and "streams"), or
+    None when PyAV is not installed or can't open the file, so callers can
+    fall back to spawning ffprobe. Results are reused while the file is
+    unchanged.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+
+    # Hand out a copy so callers can't mutate the cached entry
+    return copy.deepcopy(_probe_container_cached(str(file_path), stat.st_mtime_ns, stat.st_size))
+
+
+@functools.lru_cache(maxsize=1024)
+def _video_dimensions_cached(file_path: str, mtime_ns: int, size: int) -> Optional[Tuple[int, int]]:
+    """Memoized dimension lookup; mtime and size are part of the key so rewrites invalidate it."""
+    info = get_video_info(file_path)
+    if not info:
+        return None
+
+    for stream in info.get("streams", []):
+        if stream.get("codec_type") == "video" and stream.get("width") and stream.get("height"):
+            return int(stream["width"]), int(stream["height"])
+
+    return None
+
+
+def get_video_dimensions(file_path: str) -> Optional[Tuple[int, int]]:
+    """
+    Width and height of the first video stream.
+
+    Repeat lookups of an unchanged file are a stat() and a dict hit; the
+    tuple needs no defensive copy, unlike the full metadata dict.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        logger.error(f"❌ Video file not found: {file_path}")
+        return None
+
+    return _video_dimensions_cached(str(file_path), stat.st_mtime_ns, stat.st_size)
 
 
 def get_audio_info(file_path: str) -> Optional[Dict[str, Any]]:
-    """Get basic audio information using ffprobe."""
+    """Get basic audio information, in-process via PyAV when available, else ffprobe."""
     if not validate_file_exists(file_path, "audio"):
         return None
 
+    info = probe_container(file_path)
+    if info is not None:
+        info["streams"] = [stream for stream in info["streams"] if stream.get("codec_type") == "audio"]
+        return info
+
     cmd = [
         "ffprobe",
         "-v", "quiet",
@@ -144,11 +439,11 @@ def get_audio_info(file_path: str) -> Optional[Dict[str, Any]]:
         file_path
     ]
 
-    return run_ffprobe_command(cmd)
+    return run_cached_ffprobe_command(cmd, file_path)
 
 
 def extract_audio_from_video(video_path: str, output_path: str) -> bool:
-    """Extract audio from video file."""
+    """Extract audio from video file; use extract_and_normalize if it gets normalized next."""
     cmd = [
         "ffmpeg", "-y",
         "-i", video_path,
@@ -162,15 +457,149 @@ def extract_audio_from_video(video_path: str, output_path: str) -> bool:
     return run_ffmpeg_command(cmd, f"Extracting audio from {video_path}")
 
 
-def normalize_audio_loudness(input_path: str, output_path: str, target_lufs: float = -14) -> bool:
-    """Normalize audio to target LUFS using loudnorm filter."""
+def _decode_audio_samples_av(media_path: str, sample_rate: int) -> Optional[np.ndarray]:
+    """Decode audio to mono float32 in-process with PyAV; None if unavailable or it fails."""
+    try:
+        import av
+    except ImportError:
+        return None
+
+    try:
+        with av.open(media_path) as container:
+            if not container.streams.audio:
+                return None
+
+            stream = container.streams.audio[0]
+            resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+
+            # Packed mono float frames are (1, n); resample(None) flushes
+            chunks = []
+            for frame in container.decode(stream):
+                chunks.extend(out.to_ndarray()[0] for out in resampler.resample(frame))
+            chunks.extend(out.to_ndarray()[0] for out in resampler.resample(None))
+    except Exception:
+        return None
+
+    if not chunks:
+        return None
+
+    return np.concatenate(chunks).astype(np.float32, copy=False)
+
+
+def decode_audio_samples(media_path: str, sample_rate: int = 48000) -> Optional[np.ndarray]:
+    """
+    Decode a file's audio to mono float32 samples without touching disk.
+
+    Decodes in-process with PyAV when it is installed, otherwise reads
+    them straight from an FFmpeg pipe; returns None if decoding fails.
+    """
+    samples = _decode_audio_samples_av(media_path, sample_rate)
+    if samples is not None:
+        return samples
+
     cmd = [
-        "ffmpeg", "-y",
-        "-i", input_path,
-        "-af", f"loudnorm=I={target_lufs}:TP=-1.5:LRA=11",
-        "-ar", "48000",
+        "ffmpeg",
+        *FFMPEG_QUIET_FLAGS,
+        "-i", media_path,
+        "-vn",
+        "-f", "f32le",
+        "-ar", str(sample_rate),
         "-ac", "1",
+        "pipe:1"
+    ]
+
+    try:
+        logger.info(f"🎬 Decoding audio from {media_path}...")
+        result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"❌ FFmpeg command failed: {e}")
+        logger.error(f"Error output: {e.stderr.decode(errors='replace')}")
+        return None
+    except FileNotFoundError:
+        logger.error("❌ FFmpeg not found. Please install FFmpeg and ensure it's in your PATH.")
+        return None
+
+    # Zero-copy view over the pipe buffer
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+# Loudness range and true-peak ceiling used for every loudnorm pass
+LOUDNORM_TARGETS = "TP=-1.5:LRA=11"
+
+
+def measure_loudness(input_path: str, target_lufs: float = -14) -> Optional[Dict[str, str]]:
+    """
+    Run loudnorm's analysis pass over a file's audio.
+
+    Returns loudnorm's measured_* / offset values (as the strings it
+    prints), or None if the measurement failed.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", input_path,
+        "-vn",
+        "-af", f"loudnorm=I={target_lufs}:{LOUDNORM_TARGETS}:print_format=json",
+        "-f", "null", "-"
+    ]
+
+    try:
+        logger.info(f"🎬 Measuring loudness of {input_path}...")
+        result = subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logger.warning(f"⚠️  Loudness measurement failed: {e}")
+        return None
+
+    # The JSON summary is the last {...} block loudnorm logs at the end
+    json_start = result.stderr.rfind("{")
+    json_end = result.stderr.rfind("}")
+    try:
+        stats = json.loads(result.stderr[json_start:json_end + 1])
+        return {key: stats[key] for key in ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")}
+    except (ValueError, KeyError):
+        logger.warning("⚠️  Could not parse loudnorm measurement")
+        return None
+
+
+def extract_and_normalize(video_path: str, output_path: str, target_lufs: float = -14) -> bool:
+    """
+    Extract a file's audio and loudness-normalize it.
+
+    Writes 48 kHz mono audio (16-bit PCM for .wav outputs, otherwise the
+    output format's default codec), decoding the input once for extraction
+    and normalization together. A measurement pass runs first so the gain
+    can be applied linearly; if it fails, loudnorm's single-pass dynamic
+    mode is used instead.
+    """
+    loudnorm = f"loudnorm=I={target_lufs}:{LOUDNORM_TARGETS}"
+
+    measured = measure_loudness(video_path, target_lufs)
+    if measured is not None:
+        loudnorm += (
+            f":measured_I={measured['input_i']}"
+            f":measured_TP={measured['input_tp']}"
+            f":measured_LRA={measured['input_lra']}"
+            f":measured_thresh={measured['input_thresh']}"
+            f":offset={measured['target_offset']}"
+            ":linear=true"
+        )
+
+    # Other extensions (.m4a, .mp3, ...) get their muxer's default codec
+    codec_args = ["-acodec", "pcm_s16le"] if Path(output_path).suffix.lower() == ".wav" else []
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", video_path,
+        "-vn",  # No video
+        "-af", loudnorm,
+        *codec_args,
+        "-ar", "48000",  # 48kHz sample rate
+        "-ac", "1",  # Mono
         output_path
     ]
 
-    return run_ffmpeg_command(cmd, f"Normalizing {input_path} to {target_lufs} LUFS")
\ No newline at end of file
+    return run_ffmpeg_command(cmd, f"Extracting and normalizing audio from {video_path} to {target_lufs} LUFS")
+
+
+def normalize_audio_loudness(input_path: str, output_path: str, target_lufs: float = -14) -> bool:
+    """Normalize audio to target LUFS using loudnorm filter."""
+    return extract_and_normalize(input_path, output_path, target_lufs)
@@ -1,10 +1,50 @@
 """Video operations for Keo Shortform Factory."""
 
-import subprocess
+import math
+import functools
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
 
-from .utils import run_ffmpeg_command, calculate_overlay_position, ensure_dir
+from .exporter import build_encoder_args
+from .utils import (
+    run_ffmpeg_command,
+    overlay_position_expression,
+    ensure_dir,
+    get_video_info,
+    get_audio_info,
+    get_video_dimensions as probe_video_dimensions
+)
+
+
+# Audio codecs each output container can take as a stream copy
+CONTAINER_AUDIO_CODECS = {
+    ".mp4": {"aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"},
+    ".m4v": {"aac", "mp3", "ac3", "eac3", "alac"},
+    ".mov": {"aac", "mp3", "ac3", "alac", "pcm_s16le", "pcm_s24le", "pcm_f32le"},
+    ".mkv": {"aac", "mp3", "ac3", "eac3", "opus", "vorbis", "flac", "alac", "pcm_s16le", "pcm_s24le", "pcm_f32le"},
+    ".webm": {"opus", "vorbis"},
+}
+
+
+def audio_codec_args(source_path: str, output_path: str) -> list:
+    """
+    Audio codec arguments for writing source_path's audio into output_path.
+
+    Stream-copies when the (cached) probe shows a codec the output container
+    accepts and falls back to AAC otherwise, so an incompatible track isn't
+    only discovered when ffmpeg refuses to mux it.
+    """
+    allowed = CONTAINER_AUDIO_CODECS.get(Path(output_path).suffix.lower())
+    audio_streams = (get_audio_info(source_path) or {}).get("streams", [])
+
+    if allowed is None or not audio_streams:
+        # Unknown container or no audio to check; copying is what was asked for
+        return ["-c:a", "copy"]
+
+    if audio_streams[0].get("codec_name") in allowed:
+        return ["-c:a", "copy"]
+
+    return ["-c:a", "aac"]
 
 
 def replace_audio(
@@ -22,7 +62,7 @@ def replace_audio(
         "-map", "0:v",  # Take video from first input
         "-map", "1:a",  # Take audio from second input
         "-c:v", "copy",  # Copy video codec
-        "-c:a", "aac",   # Re-encode audio as AAC
+        *audio_codec_args(audio_path, output_path),  # Copy if the container takes it
         "-shortest",     # Match shortest stream
         output_path
     ]
@@ -31,56 +71,77 @@ def replace_audio(
 
 
 def get_video_dimensions(video_path: str) -> Tuple[int, int]:
-    """Get video dimensions using ffprobe."""
-    cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=s=x:p=0",
-        video_path
-    ]
-
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        width, height = map(int, result.stdout.strip().split('x'))
-        return width, height
-    except Exception as e:
-        print(f"❌ Error getting video dimensions: {e}")
+    """Get video dimensions from the (cached) probe metadata."""
+    dimensions = probe_video_dimensions(video_path)
+    if dimensions is None:
+        print(f"❌ Error getting video dimensions for {video_path}")
         return 1920, 1080  # Fallback to HD
 
+    return dimensions
 
-def get_overlay_dimensions(overlay_path: str) -> Tuple[int, int]:
-    """Get overlay video dimensions using ffprobe."""
-    cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=s=x:p=0",
-        overlay_path
-    ]
 
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        width, height = map(int, result.stdout.strip().split('x'))
-        return width, height
-    except Exception as e:
-        print(f"❌ Error getting overlay dimensions: {e}")
+def get_overlay_dimensions(overlay_path: str) -> Tuple[int, int]:
+    """Get overlay video dimensions from the (cached) probe metadata."""
+    dimensions = probe_video_dimensions(overlay_path)
+    if dimensions is None:
+        print(f"❌ Error getting overlay dimensions for {overlay_path}")
         return 480, 360  # Fallback to small overlay
 
+    return dimensions
+
+
+def get_keyframe_interval(clip_len: float, stride: float) -> float:
+    """
+    Keyframe spacing that puts an I-frame on every clip start and end.
+
+    Clip starts fall on multiples of stride and ends on multiples of stride
+    plus clip_len, so for whole-second values their GCD covers both.
+    """
+    if float(clip_len).is_integer() and float(stride).is_integer() and stride > 0:
+        return float(math.gcd(int(clip_len), int(stride)))
+
+    return float(stride)
+
+
+@functools.lru_cache(maxsize=64)
+def _build_overlay_filter(position: str, opacity: float, margin: int, safe_area: bool) -> str:
+    """Video filter graph for one overlay config; batches reuse it across videos."""
+    # Overlay position, resolved by FFmpeg from the actual frame sizes
+    x_expr, y_expr = overlay_position_expression(position, margin)
+
+    # First, ensure overlay has alpha or create it
+    overlay_filter = f"[1:v]format=rgba,colorchannelmixer=aa={opacity}[overlay];"
+
+    # Then composite
+    overlay_filter += f"[0:v][overlay]overlay=x='{x_expr}':y='{y_expr}'"
+
+    # Safe area boxes are drawn in the same graph rather than a second encode
+    if safe_area and margin > 0:
+        overlay_filter += f",{safe_area_filter(margin)}"
+
+    return overlay_filter
+
 
 def composite_overlay(
     base_video_path: str,
     overlay_video_path: str,
     output_path: str,
-    config: Dict[str, Any]
+    config: Dict[str, Any],
+    audio_path: Optional[str] = None,
+    audio_offset: float = 0.0,
+    threads: Optional[int] = None
 ) -> bool:
-    """Composite overlay video onto base video."""
-
-    # Get dimensions
-    base_width, base_height = get_video_dimensions(base_video_path)
-    overlay_width, overlay_height = get_overlay_dimensions(overlay_video_path)
+    """
+    Composite overlay video onto base video.
+
+    The overlay is placed with overlay-filter expressions, so neither input
+    needs probing. With audio_path, that track replaces the base audio in
+    the same pass (as replace_audio would), saving a separate remux; a
+    positive audio_offset delays it and a negative one trims its start, the
+    same shift time_shift_audio would otherwise write to a separate file.
+    threads caps both the base video's decoder and the encoder, so parallel
+    batch jobs don't each spin up a thread per core.
+    """
 
     # Get overlay configuration
     overlay_config = config.get("overlay", {})
@@ -88,31 +149,59 @@ def composite_overlay(
     opacity = overlay_config.get("opacity", 0.9)
     margin = overlay_config.get("margin_px", 24)
 
-    # Calculate overlay position
-    x_pos, y_pos = calculate_overlay_position(
-        base_width, base_height, overlay_width, overlay_height, position, margin
+    print(f"🎭 Compositing overlay at {position} with {opacity} opacity")
+
+    # Build FFmpeg filter for overlay composition
+    overlay_filter = _build_overlay_filter(
+        position, opacity, margin, bool(overlay_config.get("safe_area"))
     )
 
-    print(f"🎭 Compositing {overlay_width}x{overlay_height} overlay at ({x_pos}, {y_pos}) with {opacity} opacity")
+    # Force a keyframe on every clip boundary so the later stream-copy cuts
+    # land exactly where they are asked to instead of on the next I-frame
+    slicing_config = config.get("slicing", {})
+    keyframe_interval = get_keyframe_interval(
+        slicing_config.get("clip_len", 20),
+        slicing_config.get("stride", 18)
+    )
 
-    # Build FFmpeg filter for overlay composition
-    # First, ensure overlay has alpha or create it
-    overlay_filter = "[1:v]format=rgba,colorchannelmixer=aa={opacity}[overlay];"
+    # NVENC (with CUDA decoding of the base) when usable, else x264
+    input_args, encoder_args = build_encoder_args(
+        {"codec": "libx264", "preset": "veryfast", "crf": 20},
+        overlay_config.get("hwaccel", "auto")
+    )
 
-    # Then composite
-    overlay_filter += f"[0:v][overlay]overlay={x_pos}:{y_pos}"
+    thread_args = ["-threads", str(threads)] if threads else []
 
     cmd = [
         "ffmpeg", "-y",
+        *input_args,
+        *thread_args,
         "-i", base_video_path,
         "-i", overlay_video_path,
+    ]
+
+    if audio_path:
+        # Take audio from the third input instead of the base video
+        audio_map = "2:a"
+        if audio_offset <= -0.001:
+            cmd.extend(["-ss", f"{-audio_offset:.3f}"])
+        elif audio_offset >= 0.001:
+            overlay_filter += f";[2:a]adelay={int(audio_offset * 1000)}:all=true[aout]"
+            audio_map = "[aout]"
+
+        cmd.extend(["-i", audio_path])
+        audio_args = ["-map", audio_map, "-c:a", "aac", "-shortest"]
+    else:
+        audio_args = ["-map", "0:a?", *audio_codec_args(base_video_path, output_path)]
+
+    cmd.extend([
         "-filter_complex", overlay_filter,
-        "-c:v", "libx264",
-        "-c:a", "copy",
-        "-preset", "veryfast",
-        "-crf", "20",
+        *audio_args,
+        *encoder_args,
+        *thread_args,
+        "-force_key_frames", f"expr:gte(t,n_forced*{keyframe_interval})",
         output_path
-    ]
+    ])
 
     return run_ffmpeg_command(cmd, f"Compositing overlay onto {Path(base_video_path).name}")
 
@@ -129,18 +218,8 @@ def validate_video_composition(
         return False
 
     # Check if output has both video and audio streams
-    cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-print_format", "json",
-        "-show_streams",
-        output_path
-    ]
-
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        import json
-        data = json.loads(result.stdout)
+        data = get_video_info(output_path) or {}
 
         streams = data.get("streams", [])
         has_video = any(s.get("codec_type") == "video" for s in streams)
@@ -162,6 +241,22 @@ def validate_video_composition(
         return False
 
 
+def _is_opaque_color(color: str) -> bool:
+    """Whether an FFmpeg color ("name[@alpha]" or 0xRRGGBB[AA]) is fully opaque."""
+    name, _, alpha = color.partition("@")
+    if alpha:
+        try:
+            return float(alpha) >= 1.0
+        except ValueError:
+            return False
+
+    hex_digits = name[2:] if name.lower().startswith("0x") else name.lstrip("#")
+    if len(hex_digits) == 8:
+        return hex_digits[6:].lower() == "ff"
+
+    return True
+
+
 def create_safe_area_overlay(
     width: int,
     height: int,
@@ -170,10 +265,13 @@ def create_safe_area_overlay(
 ) -> str:
     """Create a safe area overlay filter for platform UI avoidance."""
 
+    # Opaque bands hide the frame underneath entirely, so crop it away and
+    # pad the border back; only translucent bands need drawbox blending
+    if _is_opaque_color(color):
+        return f"crop={width}:{height - 2 * margin}:0:{margin},pad={width}:{height}:0:{margin}:color={color}"
+
     # Calculate safe area (common social media safe zones)
-    safe_left = margin
     safe_top = margin
-    safe_right = width - margin
     safe_bottom = height - margin
 
     # Create drawbox filter for safe areas
@@ -186,28 +284,60 @@ def create_safe_area_overlay(
     return f"{top_box},{bottom_box}"
 
 
+def safe_area_filter(margin: int = 24, color: str = "black@0.3") -> str:
+    """
+    Safe area filter sized from the frame itself (iw/ih).
+
+    Same bands as create_safe_area_overlay, but needs no dimension probe
+    and can be appended to another filter chain.
+    """
+    if _is_opaque_color(color):
+        # pad's iw/ih are the cropped frame's, hence the +2*margin
+        return f"crop=iw:ih-{2 * margin}:0:{margin},pad=iw:ih+{2 * margin}:0:{margin}:color={color}"
+
+    top_box = f"drawbox=x=0:y=0:w=iw:h={margin}:color={color}:t=fill"
+    bottom_box = f"drawbox=x=0:y=ih-{margin}:w=iw:h={margin}:color={color}:t=fill"
+
+    return f"{top_box},{bottom_box}"
+
+
 def apply_safe_area_padding(
     input_path: str,
     output_path: str,
     config: Dict[str, Any]
 ) -> bool:
-    """Apply safe area padding to avoid platform UI elements."""
+    """
+    Apply safe area padding to avoid platform UI elements.
+
+    A zero margin draws nothing, so the input is stream-copied instead of
+    re-encoded. When compositing anyway, set overlay.safe_area so
+    composite_overlay draws the boxes in its own encode pass instead.
+    """
 
     overlay_config = config.get("overlay", {})
     margin = overlay_config.get("margin_px", 24)
 
-    # Get video dimensions
-    width, height = get_video_dimensions(input_path)
-
-    # Create padding filter
-    pad_filter = create_safe_area_overlay(width, height, margin)
+    if margin <= 0:
+        cmd = [
+            "ffmpeg", "-y", "-i", input_path,
+            "-c:v", "copy", *audio_codec_args(input_path, output_path),
+            output_path
+        ]
+        return run_ffmpeg_command(cmd, f"Copying {Path(input_path).name} (no safe area margin)")
+
+    input_args, encoder_args = build_encoder_args(
+        {"codec": "libx264", "preset": "veryfast", "crf": 20},
+        overlay_config.get("hwaccel", "auto")
+    )
 
     cmd = [
         "ffmpeg", "-y",
+        *input_args,
         "-i", input_path,
-        "-vf", pad_filter,
-        "-c:a", "copy",
+        "-vf", safe_area_filter(margin),
+        *encoder_args,
+        *audio_codec_args(input_path, output_path),
         output_path
     ]
 
-    return run_ffmpeg_command(cmd, f"Applying safe area padding to {Path(input_path).name}")
\ No newline at end of file
+    return run_ffmpeg_command(cmd, f"Applying safe area padding to {Path(input_path).name}")